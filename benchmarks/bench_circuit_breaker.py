@@ -0,0 +1,126 @@
+"""ZenQuotes fetch latency through the circuit breaker during a fake outage.
+
+Starts a local HTTP server standing in for ZenQuotes, then runs through
+healthy, slow, failing and recovered phases. Each phase prints the fetch
+latencies, how many fetches fell back and the breaker state afterwards.
+
+Run from the repository root:
+
+    python benchmarks/bench_circuit_breaker.py
+
+The exit code is 1 unless the breaker went closed -> open -> half open ->
+closed, fetches during the outage returned far sooner than the maximum
+timeout, and calls were rejected while the breaker was open.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+import utils.quote_fetcher as quote_fetcher
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+
+FETCHES_PER_PHASE = 20
+OPEN_SECONDS = 2
+# Failing fetches must return within this fraction of the breaker's maximum timeout
+FAILING_TIMEOUT_FRACTION = 0.1
+
+# (name, latency in seconds, HTTP status)
+PHASES = [
+    ("healthy", 0.02, 200),
+    ("slow", 3.0, 200),
+    ("failing", 0.01, 503),
+    ("recovered", 0.02, 200),
+]
+
+upstream = {"latency": 0.0, "status": 200}
+
+async def handle_today(request):
+    await asyncio.sleep(upstream["latency"])
+    if upstream["status"] != 200:
+        return web.Response(status=upstream["status"])
+    return web.json_response([{"q": "Fake quote of the day", "a": "Local Server"}])
+
+async def start_server():
+    app = web.Application()
+    app.router.add_get("/api/today", handle_today)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    # Port 0 picks a free port, so runs can't collide
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+async def run_phase(name, latency, status):
+    upstream["latency"] = latency
+    upstream["status"] = status
+
+    latencies = []
+    fallbacks = 0
+    for _ in range(FETCHES_PER_PHASE):
+        # Forget the cached quote so every call wants to go upstream
+        quote_fetcher._daily_quote = None
+        started = time.perf_counter()
+        quote = await quote_fetcher.get_daily_quote()
+        latencies.append(time.perf_counter() - started)
+        fallbacks += quote is None
+        await asyncio.sleep(0.05)
+
+    latencies.sort()
+    snapshot = quote_fetcher.zenquotes_breaker.snapshot()
+    print(
+        f"{name:<10} p50 {latencies[len(latencies) // 2] * 1000:>7.1f} ms  max {latencies[-1] * 1000:>7.1f} ms  "
+        f"fallbacks {fallbacks:>2}/{FETCHES_PER_PHASE}  state {snapshot['state']:<9} timeout {snapshot['timeout']}s"
+    )
+    return latencies
+
+def in_order(states, expected):
+    """Whether expected appears in states in that order, other states in between"""
+    remaining = iter(states)
+    return all(state in remaining for state in expected)
+
+async def main():
+    breaker = quote_fetcher.zenquotes_breaker
+    breaker.open_seconds = OPEN_SECONDS
+    runner = await start_server()
+    host, port = runner.addresses[0][:2]
+    quote_fetcher.ZEN_QUOTES_API_URL = f"http://{host}:{port}/api/today"
+
+    # Record the order of state changes, the breaker itself only counts them
+    states = [breaker.state]
+    transition = breaker._transition
+    def record(state):
+        states.append(state)
+        transition(state)
+    breaker._transition = record
+
+    phases = {}
+    try:
+        for name, latency, status in PHASES:
+            phases[name] = await run_phase(name, latency, status)
+            if name != PHASES[-1][0]:
+                # Let an open breaker reach half-open before the next phase
+                await asyncio.sleep(OPEN_SECONDS)
+    finally:
+        await quote_fetcher.close_session()
+        await runner.cleanup()
+
+    snapshot = breaker.snapshot()
+    print("transitions:", " -> ".join(states), f"rejected {snapshot['rejected']}")
+
+    failures = []
+    if not in_order(states, [CLOSED, OPEN, HALF_OPEN, CLOSED]) or states[-1] != CLOSED:
+        failures.append("the breaker did not go closed -> open -> half open -> closed")
+    if phases["failing"][-1] >= breaker.max_timeout * FAILING_TIMEOUT_FRACTION:
+        failures.append(f"a failing fetch took {phases['failing'][-1]:.2f}s, the maximum timeout is {breaker.max_timeout}s")
+    if not snapshot["rejected"]:
+        failures.append("no calls were rejected while the breaker was open")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    return not failures
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,98 @@
+"""Read latency and file-open counts for utils.config at 10k guilds.
+
+Run from the repository root:
+
+    python benchmarks/bench_config.py
+"""
+import asyncio
+import builtins
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiosqlite
+import utils.config as config
+import utils.database as database
+
+GUILDS = 10_000
+READS = 30_000
+UPDATES = 1_000
+FIRST_GUILD = 1_000_000_000_000_000
+
+def make_settings(guilds):
+    return {
+        str(FIRST_GUILD + i): {
+            "timezone": "Europe/Brussels",
+            "quote_time": "08:00",
+            "channel_id": 2_000_000_000_000_000 + i,
+            "interval": 24,
+            "role_id": None
+        }
+        for i in range(guilds)
+    }
+
+def legacy_get_server_settings(server_id):
+    """The original implementation: parse the whole JSON file on every read"""
+    with open("server_config.json", "r") as file:
+        data = json.load(file)
+    return data.get(str(server_id), config.DEFAULT_SETTINGS)
+
+def run_reads(label, get_settings, reads):
+    opens = 0
+    real_open = builtins.open
+
+    def counting_open(*args, **kwargs):
+        nonlocal opens
+        opens += 1
+        return real_open(*args, **kwargs)
+
+    builtins.open = counting_open
+    try:
+        start = time.perf_counter()
+        for i in range(reads):
+            get_settings(FIRST_GUILD + i % GUILDS)
+        elapsed = time.perf_counter() - start
+    finally:
+        builtins.open = real_open
+
+    print(f"{label:<10} {reads:>7} reads  {elapsed / reads * 1e6:>10.2f} µs/read  {opens:>7} file opens")
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        database.DB_PATH = os.path.join(tmp, "quotes.db")
+
+        settings = make_settings(GUILDS)
+        with open("server_config.json", "w") as file:
+            json.dump(settings, file, indent=4)
+
+        # Parsing the full file per call is slow, a small sample is enough
+        run_reads("legacy", legacy_get_server_settings, 100)
+
+        try:
+            # init_database imports (and renames) server_config.json
+            await database.init_database()
+            await config.load_config()
+            run_reads("cached", config.get_server_settings, READS)
+
+            start = time.perf_counter()
+            for i in range(UPDATES):
+                await config.update_server_settings(FIRST_GUILD + i, quote_time="09:00")
+            elapsed = time.perf_counter() - start
+            print(f"{UPDATES} single-row upserts: {elapsed / UPDATES * 1e3:.2f} ms/update")
+
+            async with aiosqlite.connect(database.DB_PATH) as db:
+                cursor = await db.execute(
+                    "EXPLAIN QUERY PLAN SELECT guild_id FROM server_settings WHERE channel_id IS NOT NULL"
+                )
+                print("configured guilds plan:", (await cursor.fetchone())[3])
+        finally:
+            # The pool's worker threads would keep the process alive
+            await database.close_database()
+
+if __name__ == "__main__":
+    asyncio.run(main())
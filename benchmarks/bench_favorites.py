@@ -0,0 +1,66 @@
+"""Favorites workload ops/sec with a connection per call vs the pool.
+
+Run from the repository root:
+
+    python benchmarks/bench_favorites.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiosqlite
+import utils.database as database
+
+OPERATIONS = 2_000
+CONCURRENCY = 8
+USERS = 200
+GUILD_ID = 1
+
+@asynccontextmanager
+async def connection_per_call():
+    """The original behaviour: a fresh aiosqlite thread and file handle per call"""
+    async with aiosqlite.connect(database.DB_PATH) as db:
+        yield db
+
+async def reaction(i):
+    """What one ❤️ costs: the feature check plus the insert"""
+    user_id = i % USERS
+    if await database.is_favorites_enabled(GUILD_ID):
+        await database.add_favorite(user_id, f"Quote number {i}", "Author", GUILD_ID)
+    await database.get_user_favorites(user_id, GUILD_ID)
+
+async def run(label):
+    await database.init_database()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(i):
+        async with semaphore:
+            await reaction(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(i) for i in range(OPERATIONS)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {OPERATIONS / elapsed:>8.0f} ops/sec")
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep init_database away from the real legacy JSON files
+        os.chdir(tmp)
+        database.DB_PATH = os.path.join(tmp, "per_call.db")
+        pooled = database.connection
+        database.connection = connection_per_call
+        await run("connection per call")
+
+        database.DB_PATH = os.path.join(tmp, "pooled.db")
+        database.connection = pooled
+        await database.open_database()
+        await run("pooled")
+        await database.close_database()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,340 @@
+"""Throughput, p99 latency and peak RSS of the bot's hot paths.
+
+Drives quote delivery through the outbox, Favorites.on_raw_reaction_add
+(and the batched write behind it), get_user_favorites and
+get_server_settings against a fake in-process bot and a temporary SQLite
+database, at 100 / 10k / 100k guilds and users.
+
+Run from the repository root:
+
+    python benchmarks/bench_hot_paths.py
+    python benchmarks/bench_hot_paths.py --scales 100,10000 --save baseline.json
+    python benchmarks/bench_hot_paths.py --compare baseline.json
+
+With --compare the exit code is 1 when any path got slower than the
+baseline by more than --tolerance (throughput or p99).
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.config as config
+import utils.database as database
+import utils.quote_corpus as quote_corpus
+import utils.quote_fetcher as quote_fetcher
+from cogs.favorites import Favorites
+from cogs.quotes import Quotes
+
+SCALES = (100, 10_000, 100_000)
+# Timed calls per path, the data set itself still has the full scale
+MAX_OPERATIONS = 20_000
+FAVORITES_PER_USER = 5
+# Reactions per batched favorites write, due guilds per scheduler tick
+REACTION_BATCH_SIZE = 100
+TICK_SIZE = 100
+CORPUS_QUOTES = 1_000
+FIRST_ID = 1_000_000_000_000_000
+BOT_USER_ID = 42
+
+message_ids = itertools.count(FIRST_ID)
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+    async def send(self, content):
+        await asyncio.sleep(0)
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.id = next(message_ids)
+        self.channel = channel
+        self.content = content
+        self.author = FakeUser(BOT_USER_ID)
+
+    async def add_reaction(self, emoji):
+        await asyncio.sleep(0)
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.messages = {}
+
+    async def send(self, content):
+        await asyncio.sleep(0)
+        message = FakeMessage(self, content)
+        self.messages[message.id] = message
+        return message
+
+    async def fetch_message(self, message_id):
+        await asyncio.sleep(0)
+        return self.messages[message_id]
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+
+class FakeBot:
+    """Just enough of commands.Bot for the cogs' hot paths"""
+
+    shard_count = None
+
+    def __init__(self, guild_ids):
+        self.user = FakeUser(BOT_USER_ID)
+        self.guilds = {guild_id: FakeGuild(guild_id) for guild_id in guild_ids}
+        self.channels = {}
+
+    def get_guild(self, guild_id):
+        return self.guilds.get(guild_id)
+
+    def get_channel(self, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id)
+        return channel
+
+    def get_user(self, user_id):
+        return None
+
+    async def fetch_user(self, user_id):
+        await asyncio.sleep(0)
+        return FakeUser(user_id)
+
+class FakeReaction:
+    """Stand-in for discord.RawReactionActionEvent"""
+
+    emoji = "❤️"
+    member = None
+
+    def __init__(self, user_id, message):
+        self.user_id = user_id
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.channel.id - FIRST_ID
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def result(latencies, elapsed):
+    latencies.sort()
+    p99 = latencies[max(0, round(0.99 * len(latencies)) - 1)]
+    return {
+        "operations": len(latencies),
+        "ops_per_sec": round(len(latencies) / elapsed, 1),
+        "p99_ms": round(p99 * 1000, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+async def timed_calls(calls):
+    """Run (and await) each call in turn, returning its latencies and the total time"""
+    latencies = []
+    # The per-send log lines would otherwise dominate the measurement
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for call in calls:
+            started = time.perf_counter()
+            outcome = call()
+            if asyncio.iscoroutine(outcome):
+                await outcome
+            latencies.append(time.perf_counter() - started)
+        elapsed = time.perf_counter() - start
+    return result(latencies, elapsed)
+
+async def timed_ticks(quotes, guild_ids, batch_size=TICK_SIZE):
+    """Queue due guilds and drain the outbox tick by tick, throughput is per guild"""
+    latencies = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for index in range(0, len(guild_ids), batch_size):
+            started = time.perf_counter()
+            await quotes.enqueue_due(guild_ids[index:index + batch_size])
+            await quotes.drain_outbox()
+            await quotes.flush_last_sent()
+            latencies.append(time.perf_counter() - started)
+        elapsed = time.perf_counter() - start
+
+    return per_item(result(latencies, elapsed), len(guild_ids), elapsed)
+
+def per_item(stats, items, elapsed):
+    """Report throughput in items instead of batches"""
+    stats["operations"] = items
+    stats["ops_per_sec"] = round(items / elapsed, 1)
+    return stats
+
+async def timed_flushes(favorites, reactions, batch_size=REACTION_BATCH_SIZE):
+    """Queue reactions in bursts and time each batched write, throughput is per reaction"""
+    latencies = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for index in range(0, len(reactions), batch_size):
+            for payload in reactions[index:index + batch_size]:
+                await favorites.on_raw_reaction_add(payload)
+            started = time.perf_counter()
+            await favorites.flush_reactions()
+            latencies.append(time.perf_counter() - started)
+        elapsed = time.perf_counter() - start
+
+    return per_item(result(latencies, elapsed), len(reactions), elapsed)
+
+def reset_memory_state():
+    """Drop what the previous scale left in module-level caches"""
+    quote_corpus._quote_ids.clear()
+    quote_corpus._quotes.clear()
+    quote_corpus._buffer.clear()
+    database._recent_posts.clear()
+    database._favorite_counts.clear()
+
+async def seed(scale):
+    """Configure scale guilds and give scale users a few favorites each"""
+    reset_memory_state()
+    guild_ids = [FIRST_ID + i for i in range(scale)]
+
+    async with database.connection() as db:
+        await db.executemany(
+            "INSERT INTO server_settings (guild_id, channel_id) VALUES (?, ?)",
+            [(guild_id, FIRST_ID + guild_id) for guild_id in guild_ids]
+        )
+        await db.executemany(
+            "INSERT INTO quotes (id, quote_hash, quote_text, quote_author) VALUES (?, ?, ?, ?)",
+            [
+                (quote_id, database.quote_hash(f"Seed quote {quote_id}"), f"Seed quote {quote_id}", "Author")
+                for quote_id in range(1, scale + 1)
+            ]
+        )
+        # Neighbouring users share quotes, like a server favoriting the same daily quote
+        await db.executemany(
+            "INSERT INTO favorites (user_id, guild_id, quote_id) VALUES (?, ?, ?)",
+            [
+                (user_id, guild_ids[user_id % scale], (user_id + n) % scale + 1)
+                for user_id in range(scale)
+                for n in range(FAVORITES_PER_USER)
+            ]
+        )
+        await db.commit()
+
+    await database.add_corpus_quotes([(f"Corpus quote {n}", "Author") for n in range(CORPUS_QUOTES)])
+    # Cached as if prefetched, so sends never go out to ZenQuotes
+    quote_fetcher._daily_quote = (quote_fetcher.upstream_day(), ("Benchmark quote of the day", "Author"))
+    await config.load_config()
+    await database.load_feature_flags()
+    await quote_corpus.load_corpus()
+    return guild_ids
+
+async def bench_scale(scale):
+    guild_ids = await seed(scale)
+    operations = min(scale, MAX_OPERATIONS)
+    bot = FakeBot(guild_ids)
+    results = {}
+
+    sample = random.sample(guild_ids, operations)
+    results["get_server_settings"] = await timed_calls(
+        (lambda guild_id=guild_id: config.get_server_settings(guild_id)) for guild_id in sample
+    )
+
+    quotes = Quotes(bot)
+    for guild_id in guild_ids:
+        quotes.reschedule(guild_id)
+    results["quote_delivery"] = await timed_ticks(quotes, sample)
+
+    favorites = Favorites(bot)
+    posts = [message for channel in bot.channels.values() for message in channel.messages.values()]
+    reactions = [FakeReaction(random.randrange(scale), random.choice(posts)) for _ in range(operations)]
+    results["on_raw_reaction_add"] = await timed_calls(
+        (lambda payload=payload: favorites.on_raw_reaction_add(payload)) for payload in reactions
+    )
+    # The listener only queues, the batched write is where the work happens
+    favorites.pending_reactions.clear()
+    results["flush_reactions"] = await timed_flushes(favorites, reactions)
+
+    users = random.sample(range(scale), operations)
+    results["get_user_favorites"] = await timed_calls(
+        (lambda user_id=user_id: database.get_user_favorites(user_id, guild_ids[user_id % scale])) for user_id in users
+    )
+
+    return results
+
+async def run_scale(scale):
+    """Benchmark one scale in a fresh temporary directory and database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        # init_database migrates legacy JSON files from the working directory
+        os.chdir(tmp)
+        database.DB_PATH = os.path.join(tmp, "quotes.db")
+        try:
+            await database.open_database()
+            await database.init_database()
+            return await bench_scale(scale)
+        finally:
+            await database.close_database()
+            await quote_fetcher.close_session()
+            os.chdir(cwd)
+
+def print_results(scale, results):
+    print(f"━━ {scale} guilds / users")
+    for path, stats in results.items():
+        print(
+            f"  {path:<22} {stats['ops_per_sec']:>10.0f} ops/sec  p99 {stats['p99_ms']:>8.3f} ms"
+            f"  peak RSS {stats['peak_rss_mb']:>7.1f} MB"
+        )
+
+def compare(baseline, current, tolerance):
+    """Print changes against the baseline, returning True on a regression"""
+    regressed = False
+    for scale, results in current.items():
+        for path, stats in results.items():
+            before = baseline.get(scale, {}).get(path)
+            if before is None:
+                continue
+
+            throughput = stats["ops_per_sec"] / before["ops_per_sec"] - 1
+            p99 = stats["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+            worse = throughput < -tolerance or p99 > tolerance
+            regressed = regressed or worse
+            print(f"{'❌' if worse else '✅'} {scale:>7} {path:<22} throughput {throughput:+.0%}  p99 {p99:+.0%}")
+    return regressed
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default=",".join(map(str, SCALES)), help="comma separated guild/user counts")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    # Resolve the paths before chdir-ing into the temporary directories
+    save_path = os.path.abspath(args.save) if args.save else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    current = {}
+    for scale in (int(scale) for scale in args.scales.split(",")):
+        current[str(scale)] = await run_scale(scale)
+        print_results(scale, current[str(scale)])
+
+    if save_path:
+        with open(save_path, "w") as f:
+            json.dump(current, f, indent=4)
+        print(f"💾 Saved results to {save_path}")
+
+    if compare_path:
+        with open(compare_path, "r") as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Tail latency of quote fetches with and without hedging to a second provider.
+
+Starts two local JSON servers: a primary that is usually fast with a slow
+tail, and a secondary that is steady but a bit slower. The same number of
+fetches goes through a HedgedFetcher with only the primary, then with both.
+
+Run from the repository root:
+
+    python benchmarks/bench_quote_providers.py
+
+The exit code is 1 unless hedging lowered the p99 and the secondary
+answered some of the fetches.
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+import utils.quote_fetcher as quote_fetcher
+from utils.quote_providers import HedgedFetcher, JsonHttpProvider
+
+FETCHES = 300
+# Primary: 20 ms, but 1 in 25 requests takes 800 ms, a tail beyond its p95
+PRIMARY_SLOW_RATE = 0.04
+
+def stub_handler(name, latency):
+    async def handle(request):
+        await asyncio.sleep(latency())
+        return web.json_response([{"q": f"Quote from the {name} stub", "a": name}])
+    return handle
+
+async def start_stub(handler):
+    """Start a stub on a free port, returning its runner and quote URL"""
+    app = web.Application()
+    app.router.add_get("/quote", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}/quote"
+
+async def run(label, fetcher):
+    latencies = []
+    winners = {}
+    for _ in range(FETCHES):
+        started = time.perf_counter()
+        quote, provider = await fetcher.fetch()
+        latencies.append(time.perf_counter() - started)
+        winners[provider.name] = winners.get(provider.name, 0) + 1
+
+    latencies.sort()
+    p50, p95, p99 = (latencies[min(len(latencies) - 1, int(pct * len(latencies)))] * 1000 for pct in (0.5, 0.95, 0.99))
+    print(f"{label:<10} p50 {p50:>6.1f} ms  p95 {p95:>6.1f} ms  p99 {p99:>6.1f} ms  answered by {winners}")
+    return p99, winners
+
+async def main():
+    random.seed(0)
+    primary_runner, primary_url = await start_stub(
+        stub_handler("primary", lambda: 0.8 if random.random() < PRIMARY_SLOW_RATE else 0.02)
+    )
+    secondary_runner, secondary_url = await start_stub(stub_handler("secondary", lambda: 0.04))
+
+    try:
+        primary = JsonHttpProvider("primary", primary_url, authoritative=True)
+        secondary = JsonHttpProvider("secondary", secondary_url)
+
+        unhedged_p99, _ = await run("unhedged", HedgedFetcher([primary]))
+        hedged_p99, winners = await run("hedged", HedgedFetcher([primary, secondary]))
+        # A slow primary request may still be finishing in the background
+        await asyncio.sleep(1)
+    finally:
+        await quote_fetcher.close_session()
+        await primary_runner.cleanup()
+        await secondary_runner.cleanup()
+
+    failures = []
+    if hedged_p99 >= unhedged_p99:
+        failures.append(f"hedging did not lower the p99 ({hedged_p99:.1f} ms vs {unhedged_p99:.1f} ms)")
+    if not winners.get("secondary"):
+        failures.append("the secondary never answered")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    return not failures
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
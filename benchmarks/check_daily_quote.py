@@ -0,0 +1,63 @@
+"""Check that the quote of the day is fetched from ZenQuotes once per day.
+
+Starts a local HTTP server standing in for ZenQuotes that counts its hits,
+then makes concurrent get_daily_quote() calls followed by repeat calls on
+the same day. All of them must get the stub's quote from a single request.
+
+Run from the repository root:
+
+    python benchmarks/check_daily_quote.py
+
+The exit code is 1 unless the stub was hit exactly once.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+import utils.quote_fetcher as quote_fetcher
+
+CONCURRENT_CALLS = 50
+REPEAT_CALLS = 20
+# Long enough for every concurrent call to arrive while the request is in flight
+UPSTREAM_LATENCY = 0.2
+QUOTE = ("Stub quote of the day", "Local Server")
+
+hits = 0
+
+async def handle_today(request):
+    global hits
+    hits += 1
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return web.json_response([{"q": QUOTE[0], "a": QUOTE[1]}])
+
+async def start_server():
+    app = web.Application()
+    app.router.add_get("/api/today", handle_today)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    # Port 0 picks a free port, so runs can't collide
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+async def main():
+    runner = await start_server()
+    host, port = runner.addresses[0][:2]
+    quote_fetcher.ZEN_QUOTES_API_URL = f"http://{host}:{port}/api/today"
+
+    try:
+        concurrent = await asyncio.gather(*(quote_fetcher.get_daily_quote() for _ in range(CONCURRENT_CALLS)))
+        repeated = [await quote_fetcher.get_daily_quote() for _ in range(REPEAT_CALLS)]
+    finally:
+        await quote_fetcher.close_session()
+        await runner.cleanup()
+
+    quotes = concurrent + repeated
+    wrong = sum(quote != QUOTE for quote in quotes)
+    print(f"{CONCURRENT_CALLS} concurrent + {REPEAT_CALLS} repeat calls: {hits} upstream hits, {wrong} calls without the stub's quote")
+    return hits == 1 and not wrong
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
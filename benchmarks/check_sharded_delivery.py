@@ -0,0 +1,159 @@
+"""Check that shard clusters sharing one database send each quote exactly once.
+
+Configures guilds spread over several shards in a temporary database, then
+starts one process per cluster (as launcher.py does), each running a Quotes
+cog against a fake bot with its own shard ids. Every fake bot can see every
+guild, so only the shard partitioning keeps the clusters apart. Each cluster
+runs a scheduler tick plus an outbox drain, then a second tick that must not
+send anything. The sends of all clusters are compared with the configured
+guilds.
+
+Run from the repository root:
+
+    python benchmarks/check_sharded_delivery.py
+    python benchmarks/check_sharded_delivery.py --guilds 5000 --shards 16 --clusters 4
+
+The exit code is 1 when a guild was sent to twice, or not at all.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.config as config
+import utils.database as database
+import utils.quote_fetcher as quote_fetcher
+from benchmarks.bench_hot_paths import FIRST_ID, FakeBot
+from cogs.quotes import OUTBOX_BATCH_SIZE, Quotes
+from utils.sharding import shard_for_guild, split_shards
+
+GUILDS = 1000
+SHARDS = 6
+CLUSTERS = 3
+
+def guild_ids(count):
+    # Consecutive values of the shard bits, so the guilds cover every shard
+    return [FIRST_ID + (index << 22) for index in range(count)]
+
+async def seed(db_path, count):
+    database.DB_PATH = db_path
+    await database.init_database()
+    async with database.connection() as db:
+        await db.executemany(
+            "INSERT INTO server_settings (guild_id, channel_id) VALUES (?, ?)",
+            [(guild_id, guild_id + 1) for guild_id in guild_ids(count)]
+        )
+        await db.commit()
+    await database.close_database()
+
+def make_all_due(quotes):
+    """Pretend every scheduled guild's slot has just arrived"""
+    now = int(time.time())
+    for guild_id, schedule in quotes.schedules.items():
+        schedule.next_due = now
+        quotes.scheduler.schedule(guild_id, now)
+
+async def tick(quotes):
+    """One quote_loop iteration, then outbox_worker drains until a batch comes back short"""
+    await quotes.enqueue_due(quotes.scheduler.pop_due())
+    while True:
+        drained, _ = await quotes.drain_outbox()
+        await quotes.flush_last_sent()
+        if drained < OUTBOX_BATCH_SIZE:
+            break
+
+async def run_cluster(db_path, count, shard_count, shard_ids, out_path):
+    database.DB_PATH = db_path
+    # Sends must not wait on ZenQuotes
+    quote_fetcher._daily_quote = (quote_fetcher.upstream_day(), ("Sharded quote", "Local Check"))
+
+    bot = FakeBot(guild_ids(count))
+    bot.shard_count = shard_count
+    bot.shard_ids = shard_ids
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        await config.load_config()
+        await database.load_feature_flags()
+        quotes = Quotes(bot)
+        quotes.last_sent = await quotes.load_last_sent()
+        await quotes.rebuild_schedule()
+
+        make_all_due(quotes)
+        await tick(quotes)
+        # Sent guilds were rescheduled for their next slot, so this must not send again
+        await tick(quotes)
+        await database.close_database()
+
+    sent = [channel_id - 1 for channel_id, channel in bot.channels.items() for _ in channel.messages]
+    with open(out_path, "w") as file:
+        json.dump({"shard_ids": shard_ids, "scheduled": len(quotes.schedules), "sent": sent}, file)
+
+def check(count, shard_count, clusters):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "quotes.db")
+        cwd = os.getcwd()
+        # init_database migrates legacy JSON files from the working directory
+        os.chdir(tmp)
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                asyncio.run(seed(db_path, count))
+
+            processes = []
+            for cluster_id, shard_ids in enumerate(split_shards(shard_count, clusters)):
+                out_path = os.path.join(tmp, f"cluster-{cluster_id}.json")
+                command = [
+                    sys.executable, os.path.abspath(__file__), "--cluster",
+                    db_path, str(count), str(shard_count), ",".join(map(str, shard_ids)), out_path
+                ]
+                processes.append((subprocess.Popen(command), out_path))
+
+            results = []
+            for process, out_path in processes:
+                if process.wait() != 0:
+                    print(f"❌ A cluster exited with {process.returncode}")
+                    return False
+                with open(out_path) as file:
+                    results.append(json.load(file))
+        finally:
+            os.chdir(cwd)
+
+    sends = Counter(guild_id for cluster in results for guild_id in cluster["sent"])
+    configured = set(guild_ids(count))
+    duplicates = [guild_id for guild_id, sent in sends.items() if sent > 1]
+    missed = configured - set(sends)
+    strays = [
+        guild_id for cluster in results for guild_id in cluster["sent"]
+        if shard_for_guild(guild_id, shard_count) not in cluster["shard_ids"]
+    ]
+
+    for cluster in results:
+        print(f"shards {cluster['shard_ids']}: scheduled {cluster['scheduled']}, sent {len(cluster['sent'])}")
+    print(f"{count} guilds, {sum(sends.values())} sends: {len(duplicates)} duplicated, {len(missed)} missed, {len(strays)} sent by the wrong cluster")
+    return not duplicates and not missed and not strays
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--cluster":
+        db_path, count, shard_count, shard_ids, out_path = sys.argv[2:]
+        asyncio.run(run_cluster(
+            db_path, int(count), int(shard_count), [int(shard_id) for shard_id in shard_ids.split(",")], out_path
+        ))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=GUILDS, help="configured guilds")
+    parser.add_argument("--shards", type=int, default=SHARDS, help="total shard count")
+    parser.add_argument("--clusters", type=int, default=CLUSTERS, help="cluster processes")
+    args = parser.parse_args()
+
+    sys.exit(0 if check(args.guilds, args.shards, args.clusters) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,29 @@
+import time
+STARTED_AT = time.perf_counter()
+
 import discord
 from discord.ext import commands
 import asyncio
+import hashlib
+import json
 import os
 from dotenv import load_dotenv
-from utils.config import delete_server_settings
-from utils.database import init_database
 
+# Before the utils imports, some of them read settings from the environment
 load_dotenv()
 
+from utils.config import load_config, delete_server_settings
+from utils.database import init_database, open_database, close_database
+from utils.metrics import start_metrics_server, stop_metrics_server
+from utils.quote_fetcher import close_session
+from utils.sharding import get_shard_config
+
+COMMAND_TREE_HASH_FILE = "data/command_tree.hash"
+
+# Seconds spent in each startup phase, printed once the bot is first ready
+startup_times = {"imports": time.perf_counter() - STARTED_AT}
+first_ready = True
+
 TOKEN = os.getenv("DISCORD_TOKEN")
 APPLICATION_ID = int(os.getenv("APPLICATION_ID"))
 
@@ -21,24 +37,67 @@ intents.messages = True
 intents.message_content = True
 intents.reactions = True
 
-bot = commands.Bot(
+# Set by launcher.py when running as one of several shard cluster processes
+SHARD_COUNT, SHARD_IDS = get_shard_config()
+
+bot = commands.AutoShardedBot(
     command_prefix=commands.when_mentioned,
     intents=intents,
-    application_id=APPLICATION_ID
+    application_id=APPLICATION_ID,
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS
 )
 
-@bot.event
-async def on_ready():
-    print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
-    print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-    
-    await init_database()
-    
+def command_tree_hash():
+    """Stable hash of the slash command payload Discord would receive"""
+    payload = sorted(
+        (command.to_dict(bot.tree) for command in bot.tree.get_commands()),
+        key=lambda command: command["name"]
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+async def sync_commands():
+    """Sync slash commands only when they changed since the last sync"""
+    tree_hash = command_tree_hash()
+    try:
+        with open(COMMAND_TREE_HASH_FILE, "r") as f:
+            if f.read().strip() == tree_hash:
+                print("✅ Slash commands unchanged, skipping sync")
+                return
+    except FileNotFoundError:
+        pass
+
+    # Clusters share the hash file, let the first one do the REST call
+    if os.getenv("CLUSTER_ID", "0") != "0":
+        return
+
     try:
         synced = await bot.tree.sync()
         print(f"✅ Synced {len(synced)} slash commands")
     except Exception as e:
         print(f"❌ Error syncing commands: {e}")
+        return
+
+    os.makedirs(os.path.dirname(COMMAND_TREE_HASH_FILE), exist_ok=True)
+    with open(COMMAND_TREE_HASH_FILE, "w") as f:
+        f.write(tree_hash)
+
+def print_startup_times():
+    startup_times["first ready"] = time.perf_counter() - STARTED_AT
+    print("⏱️ Startup: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in startup_times.items()))
+
+@bot.event
+async def on_ready():
+    global first_ready
+
+    print(f"✅ Logged in as {bot.user} (ID: {bot.user.id}) on shards {sorted(bot.shards)} of {bot.shard_count}")
+    print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+
+    # on_ready fires again after every gateway reconnect, only do this once
+    if first_ready:
+        first_ready = False
+        await sync_commands()
+        print_startup_times()
     
     await bot.change_presence(
         status=discord.Status.online,
@@ -56,10 +115,10 @@ async def on_guild_join(guild):
 @bot.event
 async def on_guild_remove(guild):
     print(f"❌ Removed from server: {guild.name} (ID: {guild.id})")
-    delete_server_settings(guild.id)
+    await delete_server_settings(guild.id)
 
 async def load_cogs():
-    cogs = ["cogs.setup", "cogs.quotes", "cogs.favorites"]
+    cogs = ["cogs.setup", "cogs.quotes", "cogs.favorites", "cogs.admin"]
     
     for cog in cogs:
         try:
@@ -69,9 +128,23 @@ async def load_cogs():
             print(f"❌ Failed to load {cog}: {e}")
 
 async def main():
-    async with bot:
-        await load_cogs()
-        await bot.start(TOKEN)
+    started = time.perf_counter()
+    await open_database()
+    await init_database()
+    await load_config()
+    startup_times["db init"] = time.perf_counter() - started
+    await start_metrics_server()
+
+    try:
+        async with bot:
+            started = time.perf_counter()
+            await load_cogs()
+            startup_times["cog load"] = time.perf_counter() - started
+            await bot.start(TOKEN)
+    finally:
+        await stop_metrics_server()
+        await close_session()
+        await close_database()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,37 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from utils import metrics
+from utils.circuit_breaker import all_breakers
+
+class Admin(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @app_commands.command(name="metrics", description="Show bot metrics (owner only)")
+    @app_commands.default_permissions(administrator=True)
+    async def metrics_cmd(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            return await interaction.response.send_message(
+                "❌ Only the bot owner can use this command.",
+                ephemeral=True
+            )
+
+        lines = [
+            f"circuit {breaker['name']}: {breaker['state']} failure_rate={breaker['failure_rate']:.0%} "
+            f"timeout={breaker['timeout']}s rejected={breaker['rejected']} transitions={breaker['transitions']}"
+            for breaker in (breaker.snapshot() for breaker in all_breakers())
+        ]
+        if metrics.METRICS_ENABLED:
+            lines += metrics.summary() or ["No samples yet"]
+        else:
+            lines.append("Metrics are disabled, set METRICS_ENABLED=1 to collect them")
+
+        text = "\n".join(lines)
+        if len(text) > 1900:
+            text = text[:1900] + "\n…"
+
+        await interaction.response.send_message(f"📈 **Metrics**\n```\n{text}\n```", ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
@@ -1,41 +1,100 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-from utils.database import add_favorite, get_user_favorites, remove_favorite, is_favorites_enabled
+from utils import metrics
+from utils.database import add_favorites, count_user_favorite_matches, count_user_favorites, get_quote_posts, get_user_favorites_page, record_quote_post, remove_favorite, search_user_favorites, favorites_enabled
+from utils.cache import LRUCache, TTLCache
+import asyncio
 import re
+import time
+
+# Reactions are written in batches collected over this window
+REACTION_BATCH_SECONDS = 1.0
+# A reaction that fails to save is retried this many times before it is dropped
+REACTION_MAX_ATTEMPTS = 3
+# Confirmation DMs waiting to be sent, further ones are dropped
+DM_QUEUE_SIZE = 1000
+USER_CACHE_SIZE = 10_000
+USER_CACHE_TTL_SECONDS = 60 * 60
+# How long a user whose DMs are closed is left alone
+DM_DISABLED_TTL_SECONDS = 6 * 60 * 60
+# Discord shows at most 25 autocomplete choices of up to 100 characters
+AUTOCOMPLETE_CHOICES = 25
+# Shorter input matches nearly everything, the search index keeps 2 character prefixes
+AUTOCOMPLETE_MIN_LENGTH = 2
+
+REACTIONS_DROPPED = metrics.counter("quotes_reactions_dropped_total", "Reactions dropped after failing to save too often")
+REACTION_SECONDS = metrics.histogram("quotes_reaction_seconds", "From a ❤️ reaction to its favorite being saved")
+FETCH_MESSAGE_CALLS = metrics.counter("quotes_fetch_message_total", "channel.fetch_message calls for unindexed messages")
+FAVORITES_ADDED = metrics.counter("quotes_favorites_added_total", "Quotes saved to favorites from reactions")
+DMS_DROPPED = metrics.counter("quotes_favorite_dms_dropped_total", "Confirmation DMs dropped because the queue was full")
 
 class FavoritesView(discord.ui.View):
-    def __init__(self, user_id, favorites, page=0):
+    def __init__(self, user_id, guild_id, total, search=None):
         super().__init__(timeout=180)
         self.user_id = user_id
-        self.favorites = favorites
-        self.page = page
+        self.guild_id = guild_id
+        self.total = total
+        self.search = search
+        self.page = 0
         self.per_page = 5
         
+        # Keyset cursor (added_at, id) that each visited page starts after
+        self.page_cursors = [None]
+        self.favorites = []
+        self.next_favorites = []
+        
         # Update button states
         self.update_buttons()
     
+    @property
+    def total_pages(self):
+        return max(1, (self.total + self.per_page - 1) // self.per_page)
+    
     def update_buttons(self):
-        total_pages = (len(self.favorites) + self.per_page - 1) // self.per_page
-        
         self.prev_button.disabled = self.page == 0
-        self.next_button.disabled = self.page >= total_pages - 1
+        self.next_button.disabled = self.page >= self.total_pages - 1
+    
+    async def fetch_page(self, page, limit):
+        # Search results are ranked, so they page by offset instead of by cursor
+        if self.search:
+            return await search_user_favorites(
+                self.user_id, self.guild_id, self.search, limit=limit, offset=page * self.per_page
+            )
+        return await get_user_favorites_page(self.user_id, self.guild_id, self.page_cursors[page], limit=limit)
+    
+    async def load_page(self):
+        """Fetch the current page plus the next one as a prefetch"""
+        rows = await self.fetch_page(self.page, self.per_page * 2)
+        self.favorites = rows[:self.per_page]
+        self.next_favorites = rows[self.per_page:]
+        self.remember_next_cursor()
+        self.update_buttons()
+    
+    async def prefetch_next_page(self):
+        if self.page + 1 < self.total_pages and len(self.page_cursors) > self.page + 1:
+            self.next_favorites = await self.fetch_page(self.page + 1, self.per_page)
+    
+    def remember_next_cursor(self):
+        if len(self.page_cursors) == self.page + 1 and self.favorites:
+            fav_id, _, _, added_at = self.favorites[-1]
+            self.page_cursors.append((added_at, fav_id))
     
     def get_embed(self):
-        start = self.page * self.per_page
-        end = start + self.per_page
-        page_favorites = self.favorites[start:end]
-        
         embed = discord.Embed(
-            title="❤️ Your Favorite Quotes",
+            title=f"🔍 Favorites matching \"{self.search}\"" if self.search else "❤️ Your Favorite Quotes",
             color=discord.Color.gold()
         )
         
-        if not page_favorites:
+        if not self.favorites and self.search:
+            embed.description = "None of your favorite quotes match that search."
+            return embed
+        
+        if not self.favorites:
             embed.description = "You don't have any favorite quotes yet!\nReact wit ❤️ to quotes to save them."
             return embed
         
-        for fav_id, quote_text, quote_author, added_at in page_favorites:
+        for fav_id, quote_text, quote_author, added_at in self.favorites:
             # Truncate long quotes
             display_text = quote_text[:150] + "..." if len(quote_text) > 150 else quote_text
             embed.add_field(
@@ -44,8 +103,8 @@ class FavoritesView(discord.ui.View):
                 inline=False
             )
         
-        total_pages = (len(self.favorites) + self.per_page - 1) // self.per_page
-        embed.set_footer(text=f"Page {self.page + 1}/{total_pages} • {len(self.favorites)} total favorites")
+        total = f"{self.total} matching favorites" if self.search else f"{self.total} total favorites"
+        embed.set_footer(text=f"Page {self.page + 1}/{self.total_pages} • {total}")
         
         return embed
     
@@ -55,7 +114,7 @@ class FavoritesView(discord.ui.View):
             return await interaction.response.send_message("❌ This is not your menu!", ephemeral=True)
         
         self.page -= 1
-        self.update_buttons()
+        await self.load_page()
         await interaction.response.edit_message(embed=self.get_embed(), view=self)
     
     @discord.ui.button(label="▶️ Next", style=discord.ButtonStyle.gray)
@@ -63,47 +122,231 @@ class FavoritesView(discord.ui.View):
         if interaction.user.id != self.user_id:
             return await interaction.response.send_message("❌ This is not your menu!", ephemeral=True)
         
+        # Show the prefetched page right away, then prefetch the one after it
         self.page += 1
+        if self.next_favorites:
+            self.favorites = self.next_favorites
+        else:
+            self.favorites = await self.fetch_page(self.page, self.per_page)
+        self.next_favorites = []
+        self.remember_next_cursor()
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_embed(), view=self)
+        
+        await self.prefetch_next_page()
 
 class Favorites(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Messages already fetched and found not to be quotes
+        self.non_quote_messages = LRUCache(4096)
+        # (user_id, message_id) -> (payload, received at, failed attempts), written in batches
+        self.pending_reactions = {}
+        self.reactions_ready = asyncio.Event()
+        self.dm_queue = asyncio.Queue(maxsize=DM_QUEUE_SIZE)
+        # user_id -> User and user_id -> DMChannel, so repeat favoriters skip the REST calls
+        self.users = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+        self.dm_channels = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+        self.dm_disabled = TTLCache(USER_CACHE_SIZE, DM_DISABLED_TTL_SECONDS)
+
+    async def cog_load(self):
+        self.reaction_worker.start()
+        self.dm_worker.start()
+
+    async def cog_unload(self):
+        self.reaction_worker.cancel()
+        self.dm_worker.cancel()
+        await self.flush_reactions()
 
     @app_commands.command(name="favorites", description="View your favorite quotes")
-    async def favorites(self, interaction: discord.Interaction):
-        favorites = await get_user_favorites(interaction.user.id, interaction.guild.id)
+    @app_commands.describe(search="Only show favorites containing these words")
+    async def favorites(self, interaction: discord.Interaction, search: str = None):
+        if search:
+            total = await count_user_favorite_matches(interaction.user.id, interaction.guild.id, search)
+        else:
+            total = await count_user_favorites(interaction.user.id, interaction.guild.id)
         
-        view = FavoritesView(interaction.user.id, favorites)
+        view = FavoritesView(interaction.user.id, interaction.guild.id, total, search)
+        await view.load_page()
         await interaction.response.send_message(embed=view.get_embed(), view=view, ephemeral=True)
 
+    @favorites.autocomplete("search")
+    async def search_autocomplete(self, interaction: discord.Interaction, current: str):
+        if len(current.strip()) < AUTOCOMPLETE_MIN_LENGTH:
+            return []
+
+        # Unranked, newest first, which stops after the first matches instead of scoring them all
+        rows = await search_user_favorites(
+            interaction.user.id, interaction.guild.id, current, limit=AUTOCOMPLETE_CHOICES, ranked=False
+        )
+        # Picking a choice searches for that quote's own text
+        return [
+            app_commands.Choice(name=f"{quote_text} — {quote_author}"[:100], value=quote_text[:100])
+            for _, quote_text, quote_author, _ in rows
+        ]
+
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
         if payload.user_id == self.bot.user.id:
             return
         
+        # Reactions in DMs, such as on the save confirmation, have no server to save to
+        if payload.guild_id is None:
+            return
+        
         if str(payload.emoji) != "❤️":
             return
         
         # Check if favorites are enabled
-        if not await is_favorites_enabled(payload.guild_id):
+        if not favorites_enabled(payload.guild_id):
             return
-        
+
+        # Queue it, repeats of the same reaction within a batch collapse into one
+        self.pending_reactions.setdefault((payload.user_id, payload.message_id), (payload, time.perf_counter(), 0))
+        self.reactions_ready.set()
+
+    @tasks.loop()
+    async def reaction_worker(self):
+        await self.reactions_ready.wait()
+        # Let a burst of reactions on a fresh quote pile up into one batch
+        await asyncio.sleep(REACTION_BATCH_SECONDS)
+        self.reactions_ready.clear()
+
+        try:
+            await self.flush_reactions()
+        except Exception as e:
+            print(f"❌ Error saving favorites: {e}")
+
+        # Reactions that failed went back into pending_reactions, retry them
+        if self.pending_reactions:
+            self.reactions_ready.set()
+
+    async def flush_reactions(self):
+        """Save every queued reaction in one transaction and queue the DMs"""
+        if not self.pending_reactions:
+            return
+
+        batch = self.pending_reactions
+        self.pending_reactions = {}
+        try:
+            favorites = await self.resolve_reactions(batch.values())
+            added = await add_favorites(favorites)
+        except Exception as e:
+            print(f"❌ Error saving favorites: {e}")
+            added = await self.save_one_by_one(batch)
+        except BaseException:
+            # Cancelled, keep them for the flush on unload
+            for key, reaction in batch.items():
+                self.pending_reactions.setdefault(key, reaction)
+            raise
+
+        now = time.perf_counter()
+        for key, (_, received_at, _) in batch.items():
+            if key not in self.pending_reactions:
+                REACTION_SECONDS.observe(now - received_at)
+        FAVORITES_ADDED.inc(amount=len(added))
+
+        members = {payload.user_id: payload.member for payload, _, _ in batch.values()}
+        for user_id, quote_text, quote_author, _ in added:
+            if user_id in self.dm_disabled:
+                continue
+            try:
+                self.dm_queue.put_nowait((user_id, members.get(user_id), quote_text, quote_author))
+            except asyncio.QueueFull:
+                DMS_DROPPED.inc()
+
+    async def save_one_by_one(self, batch):
+        """Save a failed batch reaction by reaction, so one bad reaction can't hold up the rest"""
+        added = []
+        dropped = 0
+        for key, (payload, received_at, attempts) in batch.items():
+            try:
+                added += await add_favorites(await self.resolve_reactions([(payload, received_at, attempts)]))
+            except Exception as e:
+                if attempts + 1 >= REACTION_MAX_ATTEMPTS:
+                    dropped += 1
+                    print(f"❌ Dropped ❤️ from {payload.user_id} on {payload.message_id}: {e}")
+                else:
+                    self.pending_reactions.setdefault(key, (payload, received_at, attempts + 1))
+
+        REACTIONS_DROPPED.inc(amount=dropped)
+        return added
+
+    async def resolve_reactions(self, reactions):
+        """(user_id, quote_text, quote_author, guild_id) for reactions on quote messages"""
+        reactions = [payload for payload, _, _ in reactions]
+        # Quotes the bot posted are indexed by message id, no fetch needed
+        posts = await get_quote_posts(list({payload.message_id for payload in reactions}))
+
+        favorites = []
+        for payload in reactions:
+            if payload.message_id not in posts:
+                posts[payload.message_id] = await self.parse_unindexed_message(payload)
+
+            post = posts[payload.message_id]
+            if post is not None:
+                quote_text, quote_author = post
+                quote_author = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', quote_author)
+                favorites.append((payload.user_id, quote_text, quote_author, payload.guild_id))
+        return favorites
+
+    async def parse_unindexed_message(self, payload):
+        if payload.message_id in self.non_quote_messages:
+            return None
+        return await self.parse_quote_message(payload)
+
+    @tasks.loop()
+    async def dm_worker(self):
+        """Send favorite confirmations one at a time, off the ingestion path"""
+        user_id, member, quote_text, quote_author = await self.dm_queue.get()
+        if user_id in self.dm_disabled:
+            return
+
+        try:
+            channel = await self.get_dm_channel(user_id, member)
+            await channel.send(f"❤️ Quote saved to your favorites!\n\n_{quote_text}_\n— **{quote_author}**")
+        except discord.Forbidden:
+            # User has DMs disabled
+            self.dm_disabled.set(user_id, True)
+            self.dm_channels.pop(user_id)
+        except Exception:
+            # Not CancelledError, that would keep the loop alive after cancel()
+            pass
+
+    async def get_dm_channel(self, user_id, member=None):
+        """DM channel of a user, opened at most once per cache lifetime"""
+        channel = self.dm_channels.get(user_id)
+        if channel is not None:
+            return channel
+
+        user = self.bot.get_user(user_id) or member or self.users.get(user_id)
+        if user is None:
+            user = await self.bot.fetch_user(user_id)
+            self.users.set(user_id, user)
+
+        channel = user.dm_channel or await user.create_dm()
+        self.dm_channels.set(user_id, channel)
+        return channel
+
+    @dm_worker.before_loop
+    async def before_dm_worker(self):
+        await self.bot.wait_until_ready()
+
+    async def parse_quote_message(self, payload):
+        """Recover (quote_text, author) from a quote posted before messages were indexed"""
         channel = self.bot.get_channel(payload.channel_id)
         if not channel:
-            return
+            return None
         
+        FETCH_MESSAGE_CALLS.inc()
         try:
             message = await channel.fetch_message(payload.message_id)
         except:
-            return
+            return None
         
-        if not hasattr(message, "content") or not message.content:
-            return
-
-        if message.author.id != self.bot.user.id:
-            return
+        if not hasattr(message, "content") or not message.content or message.author.id != self.bot.user.id:
+            self.non_quote_messages.set(payload.message_id, True)
+            return None
 
         content = message.content.strip()
 
@@ -114,22 +357,15 @@ class Favorites(commands.Cog):
         match = re.search(pattern, content, re.DOTALL)
 
         if not match:
-            return
+            self.non_quote_messages.set(payload.message_id, True)
+            return None
 
         quote_text = match.group("quote").strip()
         quote_author = match.group("author").strip()
 
-        quote_author = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', quote_author)
-
-            
-        success = await add_favorite(payload.user_id, quote_text, quote_author, payload.guild_id)
-            
-        if success:
-            try:
-                user = await self.bot.fetch_user(payload.user_id)
-                await user.send(f"❤️ Quote saved to your favorites!\n\n_{quote_text}_\n— **{quote_author}**")
-            except:
-                pass  # User has DMs disabled
+        # Index it so the next reaction on this message skips the fetch
+        await record_quote_post(payload.message_id, payload.guild_id, payload.channel_id, quote_text, quote_author)
+        return quote_text, quote_author
 
 async def setup(bot):
     await bot.add_cog(Favorites(bot))
@@ -1,142 +1,525 @@
 import discord
 from discord.ext import commands, tasks
-from datetime import datetime, timedelta
-import pytz
-import json
+from datetime import datetime, timezone, time as dt_time
+import asyncio
 import os
+import random
+import time
+from collections import defaultdict, deque
+from utils import metrics
 from utils.config import get_server_settings
-from utils.quote_fetcher import fetch_quote
-from utils.database import is_favorites_enabled
+from utils.quote_fetcher import FALLBACK_QUOTES, format_quote, get_daily_quote, peek_daily_quote
+from utils.quote_corpus import CORPUS_TARGET_SIZE, corpus_size, fill_buffer, flush_cursors, load_corpus, next_quote_for_guild, pop_quote, refill_corpus
+from utils.database import (
+    favorites_enabled, cache_quote_post, record_quote_posts, get_configured_guild_ids, get_last_sent_times, save_last_sent_times,
+    enqueue_deliveries, get_due_deliveries, get_next_delivery_attempt, get_outbox_guilds, complete_deliveries,
+    retry_delivery, dead_letter_delivery, clear_outbox
+)
+from utils.scheduler import GuildSchedule, QuoteScheduler
 
-LAST_SENT_FILE = "last_sent.json"
+RETRY_DELAY_SECONDS = 60
+SEND_CONCURRENCY = int(os.getenv("QUOTE_SEND_CONCURRENCY", "10"))
+LAG_SAMPLES = 10_000
+
+# Outbox deliveries taken per drain, and the retry backoff for failed sends
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_BASE_BACKOFF_SECONDS = 5
+OUTBOX_MAX_BACKOFF_SECONDS = 30 * 60
+# Give up on a slot after this many failed sends and wait for the next one
+OUTBOX_MAX_ATTEMPTS = 10
+
+# What to do with servers whose slot passed while the bot was down:
+# "skip" waits for the next slot, "once" sends right away, "spread" sends
+# once at a random point in a window sized to stay under the global rate limit
+CATCHUP_POLICY = os.getenv("CATCHUP_POLICY", "spread")
+CATCHUP_POLICIES = ("skip", "once", "spread")
+if CATCHUP_POLICY not in CATCHUP_POLICIES:
+    print(f"⚠️ Unknown CATCHUP_POLICY {CATCHUP_POLICY!r}, expected one of {', '.join(CATCHUP_POLICIES)}, using spread")
+    CATCHUP_POLICY = "spread"
+CATCHUP_GRACE_SECONDS = int(os.getenv("CATCHUP_GRACE_SECONDS", "120"))
+CATCHUP_WINDOW_SECONDS = int(os.getenv("CATCHUP_WINDOW_SECONDS", "300"))
+# Each delivery is a send plus a reaction, Discord allows 50 requests/s globally
+CATCHUP_DELIVERIES_PER_SECOND = 20
+# ZenQuotes rolls its quote of the day over at midnight UTC
+UPSTREAM_ROLLOVER = dt_time(0, 0, tzinfo=timezone.utc)
+
+TICK_SECONDS = metrics.histogram("quotes_loop_tick_seconds", "Time spent handling one scheduler wakeup")
+GUILDS_SCANNED = metrics.counter("quotes_loop_guilds_scanned_total", "Guilds popped off the schedule")
+GUILDS_DUE = metrics.counter("quotes_loop_guilds_due_total", "Popped guilds handed to delivery")
+QUOTES_SENT = metrics.counter("quotes_sent_total", "Quotes posted to servers")
+SEND_FAILURES = metrics.counter("quotes_send_failures_total", "Failed quote sends")
+DEAD_LETTERS = metrics.counter("quotes_dead_letters_total", "Deliveries dead-lettered for a missing or forbidden channel")
+FETCH_SECONDS = metrics.histogram("quotes_fetch_seconds", "Time to pick the quote for a send")
+SEND_SECONDS = metrics.histogram("quotes_send_seconds", "Time for channel.send of a quote")
+DELIVERY_LAG_SECONDS = metrics.histogram("quotes_delivery_lag_seconds", "Delay between a scheduled slot and its delivery", buckets=metrics.LAG_BUCKETS)
+SCHEDULED_GUILDS = metrics.gauge("quotes_scheduled_guilds", "Guilds on the delivery schedule")
+CATCHUP_BACKLOG = metrics.gauge("quotes_catchup_backlog", "Overdue servers from the last restart not yet sent")
+OUTBOX_PENDING = metrics.gauge("quotes_outbox_pending", "Servers with a delivery waiting in the outbox")
+OUTBOX_DEAD = metrics.gauge("quotes_outbox_dead", "Servers whose delivery was dead-lettered")
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
 
 class Quotes(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.last_sent = self.load_last_sent()
+        self.last_sent = {}
+        # Sends not yet written to the database, flushed once per tick
+        self.pending_last_sent = {}
+        self.scheduler = QuoteScheduler()
+        self.schedules = {}
+        self.send_semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+        # Overdue servers from the last restart that haven't been sent yet
+        self.catchup_backlog = set()
+        self.schedule_built = False
+        # Seconds between each guild's scheduled instant and its delivery
+        self.delivery_lags = deque(maxlen=LAG_SAMPLES)
+        # guild_id -> 'pending' or 'dead' for servers with an outbox row,
+        # those stay off the scheduler until the row is sent or cleared
+        self.outbox_guilds = {}
+        # Sent outbox rows and their messages, written with the next last_sent flush
+        self.delivered = []
+        self.pending_posts = []
+        # outbox_id -> time until which a row is left alone after its status failed to save
+        self.held_back = {}
+        self.outbox_ready = asyncio.Event()
+        # Background fetch started when a send finds no quote of the day cached
+        self.daily_refresh = None
+        SCHEDULED_GUILDS.set_function(lambda: len(self.scheduler))
+        CATCHUP_BACKLOG.set_function(lambda: len(self.catchup_backlog))
+        OUTBOX_PENDING.set_function(lambda: sum(status == "pending" for status in self.outbox_guilds.values()))
+        OUTBOX_DEAD.set_function(lambda: sum(status == "dead" for status in self.outbox_guilds.values()))
+
+    async def cog_load(self):
+        self.last_sent = await self.load_last_sent()
+        await load_corpus()
+        self.prefetch_loop.start()
+        self.rollover_loop.start()
         self.quote_loop.start()
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.quote_loop.cancel()
-        self.save_last_sent()
+        self.outbox_worker.cancel()
+        self.prefetch_loop.cancel()
+        self.rollover_loop.cancel()
+        await self.flush_last_sent()
+
+    async def flush_last_sent(self):
+        """Group-commit every send since the last flush"""
+        if self.pending_posts:
+            batch = self.pending_posts
+            self.pending_posts = []
+            try:
+                await record_quote_posts(batch)
+            except Exception as e:
+                print(f"❌ Error indexing quote posts: {e}")
+                self.pending_posts.extend(batch)
+
+        if self.delivered:
+            batch = self.delivered
+            self.delivered = []
+            try:
+                await complete_deliveries(batch)
+                # Deleted rows' ids may be reused by new deliveries
+                for outbox_id in batch:
+                    self.held_back.pop(outbox_id, None)
+            except Exception as e:
+                print(f"❌ Error clearing sent deliveries: {e}")
+                self.delivered.extend(batch)
+                # Still pending in the database, they must not be sent again
+                self.hold_back(batch)
+
+        if self.pending_last_sent:
+            batch = self.pending_last_sent
+            self.pending_last_sent = {}
+            try:
+                await save_last_sent_times(batch)
+            except Exception as e:
+                print(f"❌ Error saving last_sent: {e}")
+                for guild_id, sent_at in batch.items():
+                    self.pending_last_sent.setdefault(guild_id, sent_at)
 
-    def load_last_sent(self):
-        if not os.path.exists(LAST_SENT_FILE):
-            return {}
-        
         try:
-            with open(LAST_SENT_FILE, "r") as f:
-                data = json.load(f)
-                result = {}
-                for guild_id, timestamp_str in data.items():
-                    try:
-                        dt = datetime.fromisoformat(timestamp_str.replace('+00:00', ''))
-                        if dt.tzinfo is None:
-                            dt = pytz.utc.localize(dt)
-                        result[int(guild_id)] = dt
-                    except:
-                        continue
-                print(f"📂 Loaded {len(result)} last_sent timestamps")
-                return result
+            await flush_cursors()
         except Exception as e:
-            print(f"❌ Error loading last_sent.json: {e}")
-            return {}
+            print(f"❌ Error saving quote cursors: {e}")
 
-    def save_last_sent(self):
-        try:
-            data = {}
-            for guild_id, dt in self.last_sent.items():
+    async def load_last_sent(self):
+        result = {}
+        for guild_id, timestamp_str in (await get_last_sent_times()).items():
+            try:
+                dt = datetime.fromisoformat(timestamp_str)
                 if dt.tzinfo is None:
-                    dt = pytz.utc.localize(dt)
-                else:
-                    dt = dt.astimezone(pytz.utc)
-                data[str(guild_id)] = dt.isoformat()
-            
-            with open(LAST_SENT_FILE, "w") as f:
-                json.dump(data, f, indent=4)
-        except Exception as e:
-            print(f"❌ Error saving last_sent.json: {e}")
+                    dt = dt.replace(tzinfo=timezone.utc)
+                result[guild_id] = dt
+            except:
+                continue
+        print(f"📂 Loaded {len(result)} last_sent timestamps")
+        return result
+
+    def reschedule(self, guild_id):
+        """Rebuild a guild's schedule from its settings and update the scheduler"""
+        config = get_server_settings(guild_id)
+
+        # Queued or dead-lettered servers are rescheduled once that is resolved
+        if not config.get("channel_id") or guild_id in self.outbox_guilds:
+            self.schedules.pop(guild_id, None)
+            self.scheduler.remove(guild_id)
+            return
+
+        schedule = GuildSchedule(guild_id, config, self.last_sent.get(guild_id))
+        self.schedules[guild_id] = schedule
+        self.scheduler.schedule(guild_id, schedule.next_due)
+
+    async def rebuild_schedule(self):
+        self.scheduler.clear()
+        self.schedules.clear()
+        self.catchup_backlog.clear()
+        # Only guilds on this process' shards, other clusters schedule the rest
+        shard_count = self.bot.shard_count
+        shard_ids = getattr(self.bot, "shard_ids", None)
+        self.outbox_guilds = await get_outbox_guilds(shard_count, shard_ids)
+        for guild_id in await get_configured_guild_ids(shard_count, shard_ids):
+            if self.bot.get_guild(guild_id):
+                self.reschedule(guild_id)
+        print(f"🗓️ Scheduled {len(self.scheduler)} servers")
+        self.catch_up()
+        self.schedule_built = True
+
+    def catch_up(self, now=None, schedules=None):
+        """Apply CATCHUP_POLICY to servers whose slot passed while the bot was down"""
+        now = now or datetime.now(timezone.utc)
+        now_ts = now.timestamp()
 
-    @tasks.loop(seconds=60)
+        overdue = [
+            schedule for schedule in (self.schedules.values() if schedules is None else schedules)
+            if now_ts - schedule.next_due > CATCHUP_GRACE_SECONDS
+        ]
+        if not overdue:
+            return
+
+        missed_slots = sum(
+            int((now_ts - schedule.next_due) // (schedule.interval * 3600)) + 1
+            for schedule in overdue
+        )
+
+        if CATCHUP_POLICY == "skip":
+            for schedule in overdue:
+                self.scheduler.schedule(schedule.guild_id, schedule.skip_to(now))
+            print(f"⏭️ Catch-up: skipped {missed_slots} missed slots in {len(overdue)} servers")
+            return
+
+        self.catchup_backlog.update(schedule.guild_id for schedule in overdue)
+
+        if CATCHUP_POLICY == "spread":
+            window = max(CATCHUP_WINDOW_SECONDS, len(overdue) / CATCHUP_DELIVERIES_PER_SECOND)
+            for schedule in overdue:
+                # The lag is still measured against the missed slot in next_due
+                self.scheduler.schedule(schedule.guild_id, now_ts + random.uniform(0, window))
+            print(f"⏰ Catch-up: {len(overdue)} overdue servers ({missed_slots} missed slots) spread over {window:.0f}s")
+        else:
+            print(f"⏰ Catch-up: {len(overdue)} overdue servers ({missed_slots} missed slots) sending now")
+
+    @tasks.loop()
     async def quote_loop(self):
-        await self.bot.wait_until_ready()
-        
-        for guild in self.bot.guilds:
-            try:
-                await self.check_and_send_quote(guild)
-            except Exception as e:
-                print(f"❌ Error in {guild.name}: {e}")
+        await self.scheduler.wait()
+        started = time.perf_counter()
+
+        due_guild_ids = self.scheduler.pop_due()
+        GUILDS_SCANNED.inc(amount=len(due_guild_ids))
+        queued = await self.enqueue_due(due_guild_ids)
+        GUILDS_DUE.inc(amount=queued)
+
+        await self.flush_last_sent()
+        TICK_SECONDS.observe(time.perf_counter() - started)
 
-    async def check_and_send_quote(self, guild):
-        config = get_server_settings(guild.id)
-        channel_id = config.get("channel_id")
-        
-        if not channel_id:
+    async def enqueue_due(self, guild_ids):
+        """Render a delivery for each due guild and write them to the outbox in one go"""
+        deliveries = []
+        for guild_id in guild_ids:
+            schedule = self.schedules.get(guild_id)
+            if schedule and self.bot.get_guild(guild_id):
+                deliveries.append(self.render_delivery(guild_id, schedule))
+
+        if not deliveries:
+            return 0
+
+        try:
+            await enqueue_deliveries(deliveries)
+        except Exception as e:
+            print(f"❌ Error queueing {len(deliveries)} quotes: {e}")
+            for guild_id, *_ in deliveries:
+                self.scheduler.schedule(guild_id, time.time() + RETRY_DELAY_SECONDS)
+            return 0
+
+        for guild_id, *_ in deliveries:
+            self.outbox_guilds[guild_id] = "pending"
+            self.scheduler.remove(guild_id)
+        self.outbox_ready.set()
+        return len(deliveries)
+
+    def render_delivery(self, guild_id, schedule):
+        """(guild_id, slot, channel_id, content, quote_text, quote_author) outbox row"""
+        config = get_server_settings(guild_id)
+        role_id = config.get("role_id")
+        mention = f"<@&{role_id}> " if role_id else ""
+
+        started = time.perf_counter()
+        quote_text, author, title = self.pick_quote(guild_id, config)
+        FETCH_SECONDS.observe(time.perf_counter() - started)
+
+        content = f"{mention}{format_quote(quote_text, author, title)}"
+        return guild_id, schedule.next_due, schedule.channel_id, content, quote_text, author
+
+    @tasks.loop()
+    async def outbox_worker(self):
+        self.outbox_ready.clear()
+        try:
+            drained, lags = await self.drain_outbox()
+        except Exception as e:
+            print(f"❌ Error draining the outbox: {e}")
+            drained, lags = 0, []
+
+        if lags:
+            self.delivery_lags.extend(lags)
+            for lag in lags:
+                DELIVERY_LAG_SECONDS.observe(lag)
+            print(f"📬 Delivered {len(lags)} quotes, lag p50 {percentile(lags, 50):.1f}s p99 {percentile(lags, 99):.1f}s")
+
+        await self.flush_last_sent()
+
+        # A full batch means more are already due
+        if drained == OUTBOX_BATCH_SIZE:
             return
 
-        tz_name = config.get("timezone", "Europe/Brussels")
         try:
-            tz = pytz.timezone(tz_name)
-        except:
-            tz = pytz.timezone("Europe/Brussels")
+            next_attempt = await get_next_delivery_attempt(*self.shard_filter())
+        except Exception as e:
+            print(f"❌ Error reading the outbox: {e}")
+            next_attempt = time.time() + RETRY_DELAY_SECONDS
+        timeout = None if next_attempt is None else max(0.0, next_attempt - time.time())
+
+        # Rows due but held back would otherwise be selected again right away
+        if timeout == 0 and not drained and self.held_back:
+            timeout = max(0.0, min(self.held_back.values()) - time.time()) or RETRY_DELAY_SECONDS
 
-        local_now = datetime.now(tz)
-        
-        quote_time_str = config.get("quote_time", "08:00")
         try:
-            hour, minute = map(int, quote_time_str.split(":"))
-        except:
-            hour, minute = 8, 0
-
-        interval_hours = config.get("interval", 24)
-        last_sent = self.last_sent.get(guild.id)
-        
-        scheduled_today = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        
-        # If never sent before
-        if last_sent is None:
-            if local_now >= scheduled_today:
-                await self.send_quote(guild, channel_id, local_now)
+            await asyncio.wait_for(self.outbox_ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def shard_filter(self):
+        """(shard_count, shard_ids) of this process for the outbox queries"""
+        return self.bot.shard_count, getattr(self.bot, "shard_ids", None)
+
+    def hold_back(self, outbox_ids):
+        """Leave rows whose new status isn't saved yet alone for RETRY_DELAY_SECONDS"""
+        until = time.time() + RETRY_DELAY_SECONDS
+        for outbox_id in outbox_ids:
+            self.held_back[outbox_id] = until
+
+    async def drain_outbox(self):
+        """Send every due outbox row, returning how many were taken and their lags"""
+        now = time.time()
+        rows = await get_due_deliveries(now, OUTBOX_BATCH_SIZE, *self.shard_filter())
+
+        for outbox_id, until in list(self.held_back.items()):
+            if until <= now:
+                del self.held_back[outbox_id]
+        # Sent but not yet cleared rows are still pending in the database
+        skipped = set(self.delivered) | set(self.held_back)
+        deliveries = [delivery for delivery in rows if delivery[0] not in skipped]
+
+        # Group by channel, Discord's rate-limit bucket for sends
+        by_channel = defaultdict(list)
+        for delivery in deliveries:
+            by_channel[delivery[3]].append(delivery)
+
+        results = await asyncio.gather(*(self.deliver(channel_deliveries) for channel_deliveries in by_channel.values()))
+        return len(deliveries), [lag for channel_lags in results for lag in channel_lags]
+
+    async def deliver(self, deliveries):
+        """Send to guilds sharing a channel one after another, bounded across channels"""
+        lags = []
+        for delivery in deliveries:
+            async with self.send_semaphore:
+                try:
+                    lag = await self.send_delivery(delivery)
+                except Exception as e:
+                    print(f"❌ Error delivering to {delivery[1]}: {e}")
+                    continue
+
+            if lag is not None:
+                lags.append(lag)
+        return lags
+
+    @quote_loop.before_loop
+    async def before_quote_loop(self):
+        await self.bot.wait_until_ready()
+        await self.rebuild_schedule()
+        # Only after outbox_guilds is loaded, a send reschedules its guild
+        if not self.outbox_worker.is_running():
+            self.outbox_worker.start()
+
+    @tasks.loop(minutes=10)
+    async def prefetch_loop(self):
+        """Keep today's quote and the corpus buffer warm so sends never wait on HTTP"""
+        await get_daily_quote()
+        fill_buffer()
+
+        if corpus_size() < CORPUS_TARGET_SIZE:
+            added = await refill_corpus()
+            if added:
+                print(f"📚 Added {added} quotes to the corpus ({corpus_size()} total)")
+
+    @tasks.loop(time=UPSTREAM_ROLLOVER)
+    async def rollover_loop(self):
+        """Fetch the new quote of the day as soon as it exists, not up to 10 minutes later"""
+        await get_daily_quote()
+
+    def refresh_daily_quote(self):
+        """Start fetching the quote of the day in the background, once at a time"""
+        if self.daily_refresh is None or self.daily_refresh.done():
+            self.daily_refresh = asyncio.ensure_future(get_daily_quote())
+
+    @commands.Cog.listener()
+    async def on_server_settings_update(self, guild_id):
+        # New settings get a fresh delivery, that also revives dead-lettered servers
+        if self.outbox_guilds.pop(guild_id, None):
+            await clear_outbox(guild_id)
+        self.reschedule(guild_id)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        # Guilds available at startup are picked up by rebuild_schedule
+        if not self.schedule_built:
+            return
+
+        # Already scheduled, possibly spread or skipped by the catch-up, which
+        # rebuilding from last_sent would undo
+        if guild.id in self.schedules or guild.id in self.outbox_guilds:
             return
 
-        # Convert last_sent to server timezone
-        if last_sent.tzinfo is None:
-            last_sent = pytz.utc.localize(last_sent)
-        last_sent_local = last_sent.astimezone(tz)
-        
-        next_scheduled = last_sent_local + timedelta(hours=interval_hours)
-        
-        # Check all conditions
-        if local_now >= next_scheduled and local_now >= scheduled_today and last_sent_local < scheduled_today:
-            await self.send_quote(guild, channel_id, local_now)
-
-    async def send_quote(self, guild, channel_id, local_now):
+        # Unavailable when the schedule was built, so it missed the catch-up too
+        self.reschedule(guild.id)
+        schedule = self.schedules.get(guild.id)
+        if schedule:
+            self.catch_up(schedules=[schedule])
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.reschedule(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.outbox_guilds.pop(guild.id, None)
+        self.catchup_backlog.discard(guild.id)
+        self.schedules.pop(guild.id, None)
+        self.scheduler.remove(guild.id)
+
+    def pick_quote(self, guild_id, config):
+        """Choose a (quote_text, author, title) from memory, never waiting on the network"""
+        if config.get("quote_source") == "random":
+            quote = next_quote_for_guild(guild_id)
+            if quote:
+                return (*quote, "Random Quote")
+
+        quote = peek_daily_quote()
+        if quote:
+            return (*quote, "Daily Quote")
+
+        # Not fetched yet today or ZenQuotes is down, the next sends get it once it arrives
+        self.refresh_daily_quote()
+        quote = pop_quote()
+        if quote:
+            return (*quote, "Bonus Quote")
+
+        fallback = random.choice(FALLBACK_QUOTES)
+        return fallback["quote"], fallback["author"], "Bonus Quote"
+
+    async def send_delivery(self, delivery):
+        """Send one outbox row, returning the lag behind its slot or None if it wasn't sent"""
+        outbox_id, guild_id, slot, channel_id, content, quote_text, author, attempts = delivery
+        guild = self.bot.get_guild(guild_id)
+        name = guild.name if guild else guild_id
+
         try:
-            channel = self.bot.get_channel(channel_id)
-            if not channel:
-                return
-
-            config = get_server_settings(guild.id)
-            role_id = config.get("role_id")
-            mention = f"<@&{role_id}> " if role_id else ""
-
-            quote = fetch_quote()
-            message = await channel.send(f"{mention}{quote}")
-            
-            # Add star reaction if favorites enabled
-            if await is_favorites_enabled(guild.id):
+            channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+            started = time.perf_counter()
+            message = await channel.send(content)
+            SEND_SECONDS.observe(time.perf_counter() - started)
+        except (discord.NotFound, discord.Forbidden) as e:
+            # Channel deleted or no permission, retrying won't help
+            try:
+                await dead_letter_delivery(outbox_id, str(e))
+            except Exception:
+                self.hold_back([outbox_id])
+                raise
+            self.outbox_guilds[guild_id] = "dead"
+            self.catchup_backlog.discard(guild_id)
+            DEAD_LETTERS.inc()
+            print(f"🪦 Stopped sending quotes to {name} ({guild_id}): {e}")
+            return None
+        except Exception as e:
+            await self.retry_later(delivery, e)
+            return None
+
+        QUOTES_SENT.inc()
+        sent_at = datetime.now(timezone.utc)
+        self.delivered.append(outbox_id)
+        self.last_sent[guild_id] = sent_at
+        self.pending_last_sent[guild_id] = sent_at.isoformat()
+        self.outbox_guilds.pop(guild_id, None)
+        self.catchup_backlog.discard(guild_id)
+        self.reschedule(guild_id)
+
+        cache_quote_post(message.id, quote_text, author)
+        self.pending_posts.append((message.id, guild_id, channel_id, quote_text, author))
+
+        # Add star reaction if favorites enabled
+        if favorites_enabled(guild_id):
+            try:
                 await message.add_reaction("❤️")
-            
-            self.last_sent[guild.id] = datetime.now(pytz.utc)
-            self.save_last_sent()
-            config = get_server_settings(guild.id)
-            interval_hours = config.get("interval",24)
-            next_send = local_now + timedelta(hours=interval_hours)
-            
-            print(f"✅ Sent quote to {guild.name} ({guild.id}) at {local_now.strftime('%Y-%m-%d %H:%M:%S')}. Expected: {next_send.strftime('%Y-%m-%d %H:%M:%S')}")
+            except Exception as e:
+                print(f"❌ Error adding reaction in {name}: {e}")
 
-        except Exception as e:
-            print(f"❌ Error sending quote to {guild.name}: {e}")
+        schedule = self.schedules.get(guild_id)
+        if schedule:
+            next_send = datetime.fromtimestamp(schedule.next_due, schedule.tz)
+            print(f"✅ Sent quote to {name} ({guild_id}) at {sent_at.astimezone(schedule.tz).strftime('%Y-%m-%d %H:%M:%S')}. Expected: {next_send.strftime('%Y-%m-%d %H:%M:%S')}")
+        return sent_at.timestamp() - slot
+
+    async def retry_later(self, delivery, error):
+        """Back off exponentially with jitter, or as long as Discord asked"""
+        outbox_id, guild_id, slot, *_, attempts = delivery
+        SEND_FAILURES.inc()
+        attempts += 1
+
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            print(f"❌ Giving up on the quote for {guild_id} after {attempts} attempts: {error}")
+            self.delivered.append(outbox_id)
+            self.outbox_guilds.pop(guild_id, None)
+            self.catchup_backlog.discard(guild_id)
+            self.reschedule(guild_id)
+            schedule = self.schedules.get(guild_id)
+            if schedule:
+                self.scheduler.schedule(guild_id, schedule.skip_to(datetime.now(timezone.utc)))
+            return
+
+        delay = getattr(error, "retry_after", None)
+        if not delay:
+            delay = min(OUTBOX_MAX_BACKOFF_SECONDS, OUTBOX_BASE_BACKOFF_SECONDS * 2 ** (attempts - 1))
+            delay = random.uniform(delay / 2, delay)
+
+        print(f"❌ Error sending quote to {guild_id} (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        try:
+            await retry_delivery(outbox_id, time.time() + delay, str(error))
+        except Exception:
+            self.hold_back([outbox_id])
+            raise
 
 async def setup(bot):
     await bot.add_cog(Quotes(bot))
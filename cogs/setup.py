@@ -1,10 +1,10 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import pytz
 import re
 from utils.config import get_server_settings, update_server_settings
 from utils.database import is_favorites_enabled, set_favorites_enabled
+from utils.scheduler import is_valid_timezone
 
 class SetupView(discord.ui.View):
     def __init__(self, bot, guild_id):
@@ -14,7 +14,7 @@ class SetupView(discord.ui.View):
 
     @discord.ui.button(label="⚙️ Quote Settings", style=discord.ButtonStyle.primary)
     async def quote_settings(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(QuoteSettingsModal(self.guild_id))
+        await interaction.response.send_modal(QuoteSettingsModal(self.bot, self.guild_id))
 
     @discord.ui.button(label="✨ Feature Settings", style=discord.ButtonStyle.secondary)
     async def feature_settings(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -38,8 +38,9 @@ class SetupView(discord.ui.View):
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 class QuoteSettingsModal(discord.ui.Modal, title="Quote Settings"):
-    def __init__(self, guild_id):
+    def __init__(self, bot, guild_id):
         super().__init__()
+        self.bot = bot
         self.guild_id = guild_id
         
         config = get_server_settings(guild_id)
@@ -76,7 +77,7 @@ class QuoteSettingsModal(discord.ui.Modal, title="Quote Settings"):
         interval = int(self.interval.value)
         
         # Validate timezone
-        if timezone not in pytz.all_timezones:
+        if not is_valid_timezone(timezone):
             return await interaction.response.send_message(
                 "❌ Invalid timezone. See: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones",
                 ephemeral=True
@@ -97,12 +98,13 @@ class QuoteSettingsModal(discord.ui.Modal, title="Quote Settings"):
             )
         
         # Save settings
-        update_server_settings(
+        await update_server_settings(
             self.guild_id,
             timezone=timezone,
             quote_time=quote_time,
             interval=interval
         )
+        self.bot.dispatch("server_settings_update", self.guild_id)
         
         embed = discord.Embed(
             title="✅ Settings Updated",
@@ -157,13 +159,19 @@ class Setup(commands.Cog):
     @app_commands.command(name="setup", description="Configure bot settings")
     @app_commands.describe(
         channel="Channel to send quotes to",
-        role="Role to mention (optional)"
+        role="Role to mention (optional)",
+        source="Quote of the day for everyone, or non-repeating random quotes"
     )
+    @app_commands.choices(source=[
+        app_commands.Choice(name="Quote of the day", value="daily"),
+        app_commands.Choice(name="Random (no repeats)", value="random")
+    ])
     async def setup(
         self,
         interaction: discord.Interaction,
         channel: discord.TextChannel = None,
-        role: discord.Role = None
+        role: discord.Role = None,
+        source: app_commands.Choice[str] = None
     ):
         if not interaction.user.guild_permissions.manage_guild:
             return await interaction.response.send_message(
@@ -173,8 +181,8 @@ class Setup(commands.Cog):
         
         config = get_server_settings(interaction.guild.id)
         
-        # If channel or role provided, update them
-        if channel or role:
+        # If channel, role or source provided, update them
+        if channel or role or source:
             updates = {}
             if channel:
                 # Check permissions
@@ -188,9 +196,13 @@ class Setup(commands.Cog):
             
             if role:
                 updates["role_id"] = role.id
+
+            if source:
+                updates["quote_source"] = source.value
             
             if updates:
-                update_server_settings(interaction.guild.id, **updates)
+                await update_server_settings(interaction.guild.id, **updates)
+                self.bot.dispatch("server_settings_update", interaction.guild.id)
                 config = get_server_settings(interaction.guild.id)
         
         # Show current settings with buttons
@@ -233,6 +245,12 @@ class Setup(commands.Cog):
             inline=True
         )
         
+        embed.add_field(
+            name="📚 Quote Source",
+            value="Random (no repeats)" if config.get("quote_source") == "random" else "Quote of the day",
+            inline=True
+        )
+        
         view = SetupView(self.bot, interaction.guild.id)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
@@ -250,6 +268,7 @@ class Setup(commands.Cog):
                 "`/setup` - View and configure bot settings\n"
                 "`/setup channel:#channel` - Set quote channel\n"
                 "`/setup role:@role` - Set role to mention\n"
+                "`/setup source:<source>` - Daily or random quotes\n"
             ),
             inline=False
         )
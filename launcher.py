@@ -0,0 +1,59 @@
+"""Start the bot as several shard cluster processes.
+
+    python launcher.py --shards 16 --clusters 4
+
+Each process runs bot.py with SHARD_COUNT / SHARD_IDS set, so it connects
+only its own shards and schedules only the guilds on them. All processes
+share data/quotes.db.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+from dotenv import load_dotenv
+from utils.database import init_database, close_database
+from utils.sharding import split_shards
+
+load_dotenv()
+
+async def prepare_database():
+    # Migrate once here so the clusters don't race each other on startup
+    await init_database()
+    await close_database()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Quote Bot as shard cluster processes")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SHARD_COUNT", "1")), help="total shard count")
+    parser.add_argument("--clusters", type=int, default=int(os.getenv("CLUSTER_COUNT", "1")), help="number of processes")
+    args = parser.parse_args()
+
+    asyncio.run(prepare_database())
+
+    processes = []
+    for cluster_id, shard_ids in enumerate(split_shards(args.shards, args.clusters)):
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(args.shards),
+            SHARD_IDS=",".join(map(str, shard_ids)),
+            CLUSTER_ID=str(cluster_id)
+        )
+        processes.append(subprocess.Popen([sys.executable, "bot.py"], env=env))
+        print(f"🚀 Started cluster {cluster_id} with shards {shard_ids[0]}-{shard_ids[-1]}")
+
+    def stop(signum, frame):
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    exit_code = 0
+    for process in processes:
+        exit_code = process.wait() or exit_code
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import asyncio
+import math
+import time
+from collections import deque
+from utils import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = metrics.gauge("quotes_circuit_state", "Circuit breaker state (0 closed, 1 half open, 2 open)", ("circuit",))
+CIRCUIT_TRANSITIONS = metrics.counter("quotes_circuit_transitions_total", "Circuit breaker state changes", ("circuit", "state"))
+CIRCUIT_REJECTED = metrics.counter("quotes_circuit_rejected_total", "Calls refused while the circuit was open", ("circuit",))
+
+_breakers = []
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit is open"""
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker with a failure-rate trip and a latency-based timeout"""
+
+    def __init__(
+        self,
+        name,
+        failure_rate=0.5,
+        window=10,
+        min_calls=3,
+        open_seconds=60,
+        latency_percentile=0.95,
+        timeout_multiplier=3.0,
+        min_timeout=1.0,
+        max_timeout=10.0
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.latency_percentile = latency_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._outcomes = deque(maxlen=window)  # True for a success
+        self._latencies = deque(maxlen=100)  # seconds of recent successful calls
+        self.transitions = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        self.rejected = 0
+
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], name)
+        _breakers.append(self)
+
+    @property
+    def state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def failure_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def timeout(self):
+        """A multiple of the recent latency percentile, the maximum until there are samples"""
+        if len(self._latencies) < self.min_calls:
+            return self.max_timeout
+
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.latency_percentile * len(ordered)) - 1)
+        return min(self.max_timeout, max(self.min_timeout, ordered[index] * self.timeout_multiplier))
+
+    def allow(self):
+        """Whether a call may go upstream right now"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._trial_running:
+            return True
+        return False
+
+    async def call(self, function, *args, **kwargs):
+        """Await function under the adaptive timeout, or raise CircuitOpenError without calling it"""
+        if not self.allow():
+            self.rejected += 1
+            CIRCUIT_REJECTED.inc(self.name)
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        trial = self._state == HALF_OPEN
+        if trial:
+            self._trial_running = True
+
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(function(*args, **kwargs), timeout=self.timeout())
+        except BaseException as e:
+            # Cancelling the caller says nothing about upstream health
+            if isinstance(e, Exception):
+                self.record_failure()
+            raise
+        else:
+            self.record_success(time.monotonic() - started)
+            return result
+        finally:
+            if trial:
+                self._trial_running = False
+
+    def record_success(self, latency):
+        self._latencies.append(latency)
+        self._outcomes.append(True)
+        if self._state == HALF_OPEN:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        self._outcomes.append(False)
+        if self._state == HALF_OPEN:
+            self._transition(OPEN)
+        elif (
+            self._state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and self.failure_rate() >= self.failure_rate_threshold
+        ):
+            self._transition(OPEN)
+
+    def _transition(self, state):
+        self._state = state
+        self.transitions[state] += 1
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+        CIRCUIT_STATE.set(STATE_VALUES[state], self.name)
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
+        print(f"🔌 {self.name} circuit is now {state}")
+
+    def snapshot(self):
+        """Current state and counters, for logs and the admin command"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 3),
+            "timeout": round(self.timeout(), 3),
+            "calls": len(self._outcomes),
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions)
+        }
+
+def all_breakers():
+    return list(_breakers)
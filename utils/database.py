@@ -1,13 +1,89 @@
 import aiosqlite
+import asyncio
+import hashlib
+import json
 import os
+import re
+from contextlib import asynccontextmanager
+from utils import metrics
+from utils.cache import LRUCache
 
 DB_PATH = "data/quotes.db"
+POOL_SIZE = 4
+STATEMENT_CACHE_SIZE = 256
+MMAP_SIZE = 256 * 1024 * 1024
+# Shard cluster processes share the file, wait for each other's write locks
+BUSY_TIMEOUT_MS = 5000
+RECENT_POSTS_CACHE_SIZE = 4096
+FAVORITE_COUNTS_CACHE_SIZE = 4096
+LEGACY_CONFIG_FILE = "server_config.json"
+LEGACY_LAST_SENT_FILE = "last_sent.json"
+
+SETTINGS_COLUMNS = ("channel_id", "role_id", "timezone", "quote_time", "interval", "quote_source")
+
+_pool = None
+_connections = []
+_favorite_counts = LRUCache(FAVORITE_COUNTS_CACHE_SIZE)  # (user_id, guild_id) -> favorites count
+_recent_posts = LRUCache(RECENT_POSTS_CACHE_SIZE)  # message_id -> (quote_text, quote_author)
+_favorites_enabled = None  # guild_id -> bool, loaded by load_feature_flags
+_pool_lock = asyncio.Lock()
+
+DB_QUERY_SECONDS = metrics.histogram("quotes_db_query_seconds", "Latency of utils.database calls", ("query",))
+timed_query = metrics.timed(DB_QUERY_SECONDS)
+
+async def _open_connection():
+    db = await aiosqlite.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE)
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    await db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return db
+
+async def open_database(size: int = POOL_SIZE):
+    """Open the long-lived connection pool"""
+    global _pool
+
+    async with _pool_lock:
+        if _pool is not None:
+            return
+
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+
+        pool = asyncio.Queue()
+        for _ in range(size):
+            db = await _open_connection()
+            _connections.append(db)
+            pool.put_nowait(db)
+        _pool = pool
+
+async def close_database():
+    """Close every pooled connection"""
+    global _pool
+
+    async with _pool_lock:
+        _pool = None
+        while _connections:
+            await _connections.pop().close()
+
+@asynccontextmanager
+async def connection():
+    """Borrow a pooled connection, opening the pool on first use"""
+    if _pool is None:
+        await open_database()
+
+    pool = _pool
+    db = await pool.get()
+    try:
+        yield db
+    except:
+        await db.rollback()
+        raise
+    finally:
+        pool.put_nowait(db)
 
 async def init_database():
-    """Initialize database with only favorites"""
-    os.makedirs("data", exist_ok=True)
-    
-    async with aiosqlite.connect(DB_PATH) as db:
+    """Initialize database tables"""
+    async with connection() as db:
         # Favorites table
         await db.execute("""
             CREATE TABLE IF NOT EXISTS favorites (
@@ -27,79 +103,770 @@ async def init_database():
                 favorites_enabled BOOLEAN DEFAULT 1
             )
         """)
-        
+
+        # Per-server quote delivery settings
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS server_settings (
+                guild_id INTEGER PRIMARY KEY,
+                channel_id INTEGER,
+                role_id INTEGER,
+                timezone TEXT NOT NULL DEFAULT 'Europe/Brussels',
+                quote_time TEXT NOT NULL DEFAULT '08:00',
+                interval INTEGER NOT NULL DEFAULT 24,
+                quote_source TEXT NOT NULL DEFAULT 'daily'
+            )
+        """)
+
+        # Databases created before quote sources existed
+        cursor = await db.execute("PRAGMA table_info(server_settings)")
+        if "quote_source" not in [row[1] for row in await cursor.fetchall()]:
+            await db.execute("ALTER TABLE server_settings ADD COLUMN quote_source TEXT NOT NULL DEFAULT 'daily'")
+
+        # Lets the scheduler select only servers with a channel configured
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_server_settings_channel
+            ON server_settings (channel_id) WHERE channel_id IS NOT NULL
+        """)
+
+        # When each server last received a quote
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS last_sent (
+                guild_id INTEGER PRIMARY KEY,
+                sent_at TEXT NOT NULL
+            )
+        """)
+
+        # Local quote corpus, refilled in batches from ZenQuotes
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS quote_corpus (
+                id INTEGER PRIMARY KEY,
+                quote_text TEXT NOT NULL,
+                quote_author TEXT NOT NULL,
+                UNIQUE (quote_text, quote_author)
+            )
+        """)
+
+        # Last corpus quote each server got, so random quotes don't repeat
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS quote_cursors (
+                guild_id INTEGER PRIMARY KEY,
+                quote_id INTEGER NOT NULL
+            )
+        """)
+
+        # Quotes the bot posted, so reactions resolve without fetching the message
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS quote_posts (
+                message_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                quote_text TEXT NOT NULL,
+                quote_author TEXT NOT NULL,
+                posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Rendered quote deliveries, one per server and scheduled slot,
+        # removed once sent and kept as 'dead' when the channel is unusable
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS quote_outbox (
+                id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                quote_text TEXT NOT NULL,
+                quote_author TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                UNIQUE (guild_id, slot)
+            )
+        """)
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_quote_outbox_due
+            ON quote_outbox (next_attempt) WHERE status = 'pending'
+        """)
+
+        await migrate_legacy_json(db)
+        await run_migrations(db)
+
         await db.commit()
-        print("✅ Database initialized")
 
-async def add_favorite(user_id: int, quote_text: str, quote_author: str, guild_id: int):
-    """Add a quote to user's favorites"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Check if already favorited
+    await load_feature_flags()
+    print("✅ Database initialized")
+
+def quote_hash(quote_text: str):
+    """Fixed-width 64-bit hash of a quote's text"""
+    digest = hashlib.blake2b(quote_text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+async def _add_favorites_quote_hash(db):
+    """Hash favorites' quote text and index the per-user lookups"""
+    await db.execute("ALTER TABLE favorites ADD COLUMN quote_hash INTEGER")
+
+    cursor = await db.execute("SELECT id, quote_text FROM favorites")
+    await db.executemany(
+        "UPDATE favorites SET quote_hash = ? WHERE id = ?",
+        [(quote_hash(quote_text), favorite_id) for favorite_id, quote_text in await cursor.fetchall()]
+    )
+
+    # Keep the oldest copy of anything favorited twice before adding the constraint
+    await db.execute("""
+        DELETE FROM favorites WHERE id NOT IN (
+            SELECT MIN(id) FROM favorites GROUP BY user_id, guild_id, quote_hash
+        )
+    """)
+
+    await db.execute("""
+        CREATE UNIQUE INDEX idx_favorites_user_quote
+        ON favorites (user_id, guild_id, quote_hash)
+    """)
+    await db.execute("""
+        CREATE INDEX idx_favorites_user_added
+        ON favorites (user_id, guild_id, added_at DESC, id DESC)
+    """)
+
+async def _normalize_favorites(db):
+    """Move quote text into a shared quotes table that favorites reference by id"""
+    await db.execute("""
+        CREATE TABLE quotes (
+            id INTEGER PRIMARY KEY,
+            quote_hash INTEGER NOT NULL UNIQUE,
+            quote_text TEXT NOT NULL,
+            quote_author TEXT NOT NULL
+        )
+    """)
+    # One row per distinct text, keeping the author of its oldest favorite
+    await db.execute("""
+        INSERT INTO quotes (quote_hash, quote_text, quote_author)
+        SELECT quote_hash, quote_text, quote_author FROM favorites
+        WHERE id IN (SELECT MIN(id) FROM favorites GROUP BY quote_hash)
+    """)
+
+    await db.execute("""
+        CREATE TABLE favorites_normalized (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            quote_id INTEGER NOT NULL REFERENCES quotes (id),
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, guild_id, quote_id)
+        )
+    """)
+    await db.execute("""
+        INSERT INTO favorites_normalized (id, user_id, guild_id, quote_id, added_at)
+        SELECT f.id, f.user_id, f.guild_id, q.id, f.added_at
+        FROM favorites f JOIN quotes q ON q.quote_hash = f.quote_hash
+    """)
+
+    await db.execute("DROP TABLE favorites")
+    await db.execute("ALTER TABLE favorites_normalized RENAME TO favorites")
+    await db.execute("""
+        CREATE INDEX idx_favorites_user_added
+        ON favorites (user_id, guild_id, added_at DESC, id DESC)
+    """)
+
+async def _add_favorites_search(db):
+    """Full-text index over favorited quotes, kept in sync by triggers on favorites"""
+    # The index reads its text through this view, so quote text is still stored once
+    await db.execute("""
+        CREATE VIEW favorite_quotes AS
+        SELECT f.id, q.quote_text, q.quote_author, 'u' || f.user_id || 'g' || f.guild_id AS scope
+        FROM favorites f JOIN quotes q ON q.id = f.quote_id
+    """)
+    await db.execute("""
+        CREATE VIRTUAL TABLE favorites_fts USING fts5(
+            quote_text, quote_author, scope,
+            content = 'favorite_quotes', content_rowid = 'id',
+            prefix = '2'
+        )
+    """)
+    await db.execute("""
+        CREATE TRIGGER favorites_fts_insert AFTER INSERT ON favorites BEGIN
+            INSERT INTO favorites_fts (rowid, quote_text, quote_author, scope)
+            SELECT new.id, quote_text, quote_author, 'u' || new.user_id || 'g' || new.guild_id
+            FROM quotes WHERE id = new.quote_id;
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER favorites_fts_delete AFTER DELETE ON favorites BEGIN
+            INSERT INTO favorites_fts (favorites_fts, rowid, quote_text, quote_author, scope)
+            SELECT 'delete', old.id, quote_text, quote_author, 'u' || old.user_id || 'g' || old.guild_id
+            FROM quotes WHERE id = old.quote_id;
+        END
+    """)
+    await db.execute("INSERT INTO favorites_fts (favorites_fts) VALUES ('rebuild')")
+
+# (version, migration) pairs, applied once each in order
+MIGRATIONS = [
+    (1, _add_favorites_quote_hash),
+    (2, _normalize_favorites),
+    (3, _add_favorites_search),
+]
+
+async def run_migrations(db):
+    """Apply schema migrations newer than the stored schema version"""
+    await db.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    await db.commit()
+
+    # Take the write lock before reading the version so that concurrently
+    # starting processes apply each migration exactly once
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = await db.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        current = (await cursor.fetchone())[0]
+
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+
+            await migration(db)
+            await db.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            print(f"🔧 Applied schema migration {version}: {migration.__name__}")
+
+        await db.commit()
+    except:
+        await db.rollback()
+        raise
+
+async def migrate_legacy_json(db):
+    """One-shot import of server_config.json and last_sent.json"""
+    if os.path.exists(LEGACY_CONFIG_FILE):
+        with open(LEGACY_CONFIG_FILE, "r") as file:
+            config = json.load(file)
+
+        await db.executemany(
+            """INSERT OR IGNORE INTO server_settings
+               (guild_id, channel_id, role_id, timezone, quote_time, interval)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                (
+                    int(guild_id),
+                    settings.get("channel_id"),
+                    settings.get("role_id"),
+                    settings.get("timezone", "Europe/Brussels"),
+                    settings.get("quote_time", "08:00"),
+                    settings.get("interval", 24)
+                )
+                for guild_id, settings in config.items()
+            ]
+        )
+        await db.commit()
+        os.replace(LEGACY_CONFIG_FILE, LEGACY_CONFIG_FILE + ".migrated")
+        print(f"📦 Migrated {len(config)} server settings from {LEGACY_CONFIG_FILE}")
+
+    if os.path.exists(LEGACY_LAST_SENT_FILE):
+        with open(LEGACY_LAST_SENT_FILE, "r") as file:
+            last_sent = json.load(file)
+
+        await db.executemany(
+            "INSERT OR IGNORE INTO last_sent (guild_id, sent_at) VALUES (?, ?)",
+            [(int(guild_id), sent_at) for guild_id, sent_at in last_sent.items()]
+        )
+        await db.commit()
+        os.replace(LEGACY_LAST_SENT_FILE, LEGACY_LAST_SENT_FILE + ".migrated")
+        print(f"📦 Migrated {len(last_sent)} last_sent timestamps from {LEGACY_LAST_SENT_FILE}")
+
+@timed_query
+async def get_all_server_settings():
+    """Get settings for every configured server"""
+    async with connection() as db:
         cursor = await db.execute(
-            "SELECT id FROM favorites WHERE user_id = ? AND quote_text = ? AND guild_id = ?",
-            (user_id, quote_text, guild_id)
+            "SELECT guild_id, channel_id, role_id, timezone, quote_time, interval, quote_source FROM server_settings"
         )
-        exists = await cursor.fetchone()
-        
-        if exists:
-            return False  # Already favorited
-        
+        rows = await cursor.fetchall()
+
+    return {row[0]: dict(zip(SETTINGS_COLUMNS, row[1:])) for row in rows}
+
+@timed_query
+async def save_server_settings(guild_id: int, settings: dict):
+    """Insert or update the settings row of a single server"""
+    async with connection() as db:
+        await db.execute(
+            """INSERT INTO server_settings (guild_id, channel_id, role_id, timezone, quote_time, interval, quote_source)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(guild_id) DO UPDATE SET
+                   channel_id = excluded.channel_id,
+                   role_id = excluded.role_id,
+                   timezone = excluded.timezone,
+                   quote_time = excluded.quote_time,
+                   interval = excluded.interval,
+                   quote_source = excluded.quote_source""",
+            (guild_id, *(settings.get(column) for column in SETTINGS_COLUMNS))
+        )
+        await db.commit()
+
+@timed_query
+async def remove_server_settings(guild_id: int):
+    """Delete every row the bot keeps about a server"""
+    async with connection() as db:
+        await db.execute("DELETE FROM server_settings WHERE guild_id = ?", (guild_id,))
+        await db.execute("DELETE FROM last_sent WHERE guild_id = ?", (guild_id,))
+        await db.execute("DELETE FROM quote_cursors WHERE guild_id = ?", (guild_id,))
+        await db.execute("DELETE FROM quote_outbox WHERE guild_id = ?", (guild_id,))
+        await db.commit()
+
+def _shard_filter(shard_count: int = None, shard_ids: list = None):
+    """SQL condition (and its parameters) matching guild_id on the given shards"""
+    if not shard_count or shard_ids is None:
+        return "1", ()
+
+    placeholders = ", ".join("?" for _ in shard_ids)
+    return f"(guild_id >> 22) % ? IN ({placeholders})", (shard_count, *shard_ids)
+
+@timed_query
+async def get_configured_guild_ids(shard_count: int = None, shard_ids: list = None):
+    """Get ids of servers that have a quote channel set, optionally only on some shards"""
+    shards, params = _shard_filter(shard_count, shard_ids)
+    async with connection() as db:
+        cursor = await db.execute(
+            f"SELECT guild_id FROM server_settings WHERE channel_id IS NOT NULL AND {shards}",
+            params
+        )
+        return [row[0] for row in await cursor.fetchall()]
+
+@timed_query
+async def get_last_sent_times():
+    """Get the ISO timestamp of the last quote sent to each server"""
+    async with connection() as db:
+        cursor = await db.execute("SELECT guild_id, sent_at FROM last_sent")
+        return dict(await cursor.fetchall())
+
+@timed_query
+async def save_last_sent_times(times: dict):
+    """Upsert {guild_id: ISO timestamp} rows in a single transaction"""
+    if not times:
+        return
+
+    async with connection() as db:
+        await db.executemany(
+            """INSERT INTO last_sent (guild_id, sent_at) VALUES (?, ?)
+               ON CONFLICT(guild_id) DO UPDATE SET sent_at = excluded.sent_at""",
+            list(times.items())
+        )
+        await db.commit()
+
+@timed_query
+async def enqueue_deliveries(deliveries: list):
+    """Add (guild_id, slot, channel_id, content, quote_text, quote_author) rows to the outbox, once per slot"""
+    if not deliveries:
+        return
+
+    async with connection() as db:
+        await db.executemany(
+            """INSERT INTO quote_outbox (guild_id, slot, channel_id, content, quote_text, quote_author)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(guild_id, slot) DO NOTHING""",
+            deliveries
+        )
+        await db.commit()
+
+@timed_query
+async def get_due_deliveries(now: float, limit: int, shard_count: int = None, shard_ids: list = None):
+    """Pending outbox rows whose next attempt has come, oldest first"""
+    shards, params = _shard_filter(shard_count, shard_ids)
+    async with connection() as db:
+        cursor = await db.execute(
+            f"""SELECT id, guild_id, slot, channel_id, content, quote_text, quote_author, attempts
+                FROM quote_outbox
+                WHERE status = 'pending' AND next_attempt <= ? AND {shards}
+                ORDER BY next_attempt LIMIT ?""",
+            (now, *params, limit)
+        )
+        return await cursor.fetchall()
+
+@timed_query
+async def get_next_delivery_attempt(shard_count: int = None, shard_ids: list = None):
+    """Epoch of the earliest pending retry, or None if the outbox is empty"""
+    shards, params = _shard_filter(shard_count, shard_ids)
+    async with connection() as db:
+        cursor = await db.execute(
+            f"SELECT MIN(next_attempt) FROM quote_outbox WHERE status = 'pending' AND {shards}",
+            params
+        )
+        return (await cursor.fetchone())[0]
+
+@timed_query
+async def get_outbox_guilds(shard_count: int = None, shard_ids: list = None):
+    """Map servers with an outbox row to its status ('pending' or 'dead')"""
+    shards, params = _shard_filter(shard_count, shard_ids)
+    async with connection() as db:
+        cursor = await db.execute(f"SELECT guild_id, status FROM quote_outbox WHERE {shards}", params)
+        return dict(await cursor.fetchall())
+
+@timed_query
+async def complete_deliveries(outbox_ids: list):
+    """Remove sent deliveries from the outbox in one transaction"""
+    if not outbox_ids:
+        return
+
+    async with connection() as db:
+        await db.executemany("DELETE FROM quote_outbox WHERE id = ?", [(outbox_id,) for outbox_id in outbox_ids])
+        await db.commit()
+
+@timed_query
+async def retry_delivery(outbox_id: int, next_attempt: float, error: str):
+    """Count a failed attempt and push the next one back"""
+    async with connection() as db:
         await db.execute(
-            "INSERT INTO favorites (user_id, quote_text, quote_author, guild_id) VALUES (?, ?, ?, ?)",
-            (user_id, quote_text, quote_author, guild_id)
+            """UPDATE quote_outbox SET attempts = attempts + 1, next_attempt = ?, last_error = ?
+               WHERE id = ?""",
+            (next_attempt, error, outbox_id)
         )
         await db.commit()
-        return True
 
+@timed_query
+async def dead_letter_delivery(outbox_id: int, error: str):
+    """Park a delivery whose channel is gone or no longer writable"""
+    async with connection() as db:
+        await db.execute(
+            "UPDATE quote_outbox SET status = 'dead', attempts = attempts + 1, last_error = ? WHERE id = ?",
+            (error, outbox_id)
+        )
+        await db.commit()
+
+@timed_query
+async def clear_outbox(guild_id: int):
+    """Drop a server's queued and dead deliveries"""
+    async with connection() as db:
+        await db.execute("DELETE FROM quote_outbox WHERE guild_id = ?", (guild_id,))
+        await db.commit()
+
+@timed_query
+async def add_corpus_quotes(quotes):
+    """Store (quote_text, quote_author) pairs, skipping ones already known"""
+    async with connection() as db:
+        await db.executemany(
+            "INSERT OR IGNORE INTO quote_corpus (quote_text, quote_author) VALUES (?, ?)",
+            quotes
+        )
+        await db.commit()
+
+@timed_query
+async def get_corpus_quotes(after_id: int = 0):
+    """Get corpus quotes with an id above after_id, oldest first"""
+    async with connection() as db:
+        cursor = await db.execute(
+            "SELECT id, quote_text, quote_author FROM quote_corpus WHERE id > ? ORDER BY id",
+            (after_id,)
+        )
+        return await cursor.fetchall()
+
+@timed_query
+async def get_quote_cursors():
+    """Get the last corpus quote id sent to each server"""
+    async with connection() as db:
+        cursor = await db.execute("SELECT guild_id, quote_id FROM quote_cursors")
+        return dict(await cursor.fetchall())
+
+@timed_query
+async def save_quote_cursors(cursors: dict):
+    """Upsert {guild_id: last corpus quote id} rows in a single transaction"""
+    if not cursors:
+        return
+
+    async with connection() as db:
+        await db.executemany(
+            """INSERT INTO quote_cursors (guild_id, quote_id) VALUES (?, ?)
+               ON CONFLICT(guild_id) DO UPDATE SET quote_id = excluded.quote_id""",
+            list(cursors.items())
+        )
+        await db.commit()
+
+@timed_query
+async def record_quote_post(message_id: int, guild_id: int, channel_id: int, quote_text: str, quote_author: str):
+    """Remember which quote a bot message contains"""
+    _recent_posts.set(message_id, (quote_text, quote_author))
+
+    async with connection() as db:
+        await db.execute(
+            """INSERT OR REPLACE INTO quote_posts (message_id, guild_id, channel_id, quote_text, quote_author)
+               VALUES (?, ?, ?, ?, ?)""",
+            (message_id, guild_id, channel_id, quote_text, quote_author)
+        )
+        await db.commit()
+
+def cache_quote_post(message_id: int, quote_text: str, quote_author: str):
+    """Make a just-sent quote resolvable before its row is written"""
+    _recent_posts.set(message_id, (quote_text, quote_author))
+
+@timed_query
+async def record_quote_posts(posts: list):
+    """Index many (message_id, guild_id, channel_id, quote_text, quote_author) posts in one transaction"""
+    if not posts:
+        return
+
+    for message_id, _, _, quote_text, quote_author in posts:
+        cache_quote_post(message_id, quote_text, quote_author)
+
+    async with connection() as db:
+        await db.executemany(
+            """INSERT OR REPLACE INTO quote_posts (message_id, guild_id, channel_id, quote_text, quote_author)
+               VALUES (?, ?, ?, ?, ?)""",
+            posts
+        )
+        await db.commit()
+
+@timed_query
+async def get_quote_posts(message_ids: list):
+    """Map each quote message id to (quote_text, quote_author) with one query, others are left out"""
+    posts = {}
+    missing = []
+    for message_id in message_ids:
+        post = _recent_posts.get(message_id)
+        if post is None:
+            missing.append(message_id)
+        else:
+            posts[message_id] = post
+
+    async with connection() as db:
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            cursor = await db.execute(
+                f"SELECT message_id, quote_text, quote_author FROM quote_posts WHERE message_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for message_id, quote_text, quote_author in await cursor.fetchall():
+                posts[message_id] = (quote_text, quote_author)
+                _recent_posts.set(message_id, posts[message_id])
+
+    return posts
+
+async def _intern_quotes(db, quotes: dict):
+    """Make sure every {quote_hash: (quote_text, quote_author)} has a quotes row, returning {quote_hash: id}"""
+    await db.executemany(
+        """INSERT INTO quotes (quote_hash, quote_text, quote_author) VALUES (?, ?, ?)
+           ON CONFLICT(quote_hash) DO NOTHING""",
+        [(hashed, quote_text, quote_author) for hashed, (quote_text, quote_author) in quotes.items()]
+    )
+
+    ids = {}
+    hashes = list(quotes)
+    # Stay under SQLite's bound parameter limit
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        cursor = await db.execute(
+            f"SELECT quote_hash, id FROM quotes WHERE quote_hash IN ({','.join('?' * len(chunk))})",
+            chunk
+        )
+        ids.update(await cursor.fetchall())
+    return ids
+
+@timed_query
+async def add_favorite(user_id: int, quote_text: str, quote_author: str, guild_id: int):
+    """Add a quote to user's favorites"""
+    hashed = quote_hash(quote_text)
+    async with connection() as db:
+        quote_ids = await _intern_quotes(db, {hashed: (quote_text, quote_author)})
+        # The unique constraint makes an existing favorite a no-op
+        cursor = await db.execute(
+            """INSERT INTO favorites (user_id, guild_id, quote_id) VALUES (?, ?, ?)
+               ON CONFLICT(user_id, guild_id, quote_id) DO NOTHING""",
+            (user_id, guild_id, quote_ids[hashed])
+        )
+        await db.commit()
+
+    if cursor.rowcount != 1:
+        return False
+
+    _favorite_counts.pop((user_id, guild_id), None)
+    return True
+
+@timed_query
+async def add_favorites(favorites: list):
+    """Add many (user_id, quote_text, quote_author, guild_id) in one transaction, returning the new ones"""
+    if not favorites:
+        return []
+
+    quotes = {}
+    keys = {}  # (user_id, guild_id, quote_hash) -> first favorite with that key
+    for favorite in favorites:
+        user_id, quote_text, quote_author, guild_id = favorite
+        hashed = quote_hash(quote_text)
+        quotes.setdefault(hashed, (quote_text, quote_author))
+        keys.setdefault((user_id, guild_id, hashed), favorite)
+
+    async with connection() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        quote_ids = await _intern_quotes(db, quotes)
+
+        rows = [(user_id, guild_id, quote_ids[hashed]) for user_id, guild_id, hashed in keys]
+        added = set()
+        # Only rows that weren't favorites yet come back, 300 rows stay under the parameter limit
+        for start in range(0, len(rows), 300):
+            chunk = rows[start:start + 300]
+            cursor = await db.execute(
+                f"""INSERT INTO favorites (user_id, guild_id, quote_id) VALUES {','.join(['(?, ?, ?)'] * len(chunk))}
+                    ON CONFLICT(user_id, guild_id, quote_id) DO NOTHING
+                    RETURNING user_id, guild_id, quote_id""",
+                [value for row in chunk for value in row]
+            )
+            added.update(tuple(row) for row in await cursor.fetchall())
+        await db.commit()
+
+    for user_id, guild_id, _ in added:
+        _favorite_counts.pop((user_id, guild_id), None)
+
+    return [
+        favorite for (user_id, guild_id, hashed), favorite in keys.items()
+        if (user_id, guild_id, quote_ids[hashed]) in added
+    ]
+
+@timed_query
 async def remove_favorite(user_id: int, favorite_id: int):
     """Remove a favorite by ID"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "DELETE FROM favorites WHERE id = ? AND user_id = ?",
+    async with connection() as db:
+        cursor = await db.execute(
+            "DELETE FROM favorites WHERE id = ? AND user_id = ? RETURNING guild_id",
             (favorite_id, user_id)
         )
+        removed = await cursor.fetchall()
         await db.commit()
 
+    for guild_id, in removed:
+        _favorite_counts.pop((user_id, guild_id), None)
+
+@timed_query
 async def get_user_favorites(user_id: int, guild_id: int = None):
     """Get user's favorite quotes"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with connection() as db:
         if guild_id:
             cursor = await db.execute(
-                "SELECT id, quote_text, quote_author, added_at FROM favorites WHERE user_id = ? AND guild_id = ? ORDER BY added_at DESC",
+                """SELECT f.id, q.quote_text, q.quote_author, f.added_at
+                   FROM favorites f JOIN quotes q ON q.id = f.quote_id
+                   WHERE f.user_id = ? AND f.guild_id = ? ORDER BY f.added_at DESC""",
                 (user_id, guild_id)
             )
         else:
             cursor = await db.execute(
-                "SELECT id, quote_text, quote_author, added_at FROM favorites WHERE user_id = ? ORDER BY added_at DESC",
+                """SELECT f.id, q.quote_text, q.quote_author, f.added_at
+                   FROM favorites f JOIN quotes q ON q.id = f.quote_id
+                   WHERE f.user_id = ? ORDER BY f.added_at DESC""",
                 (user_id,)
             )
         return await cursor.fetchall()
 
-async def is_favorites_enabled(guild_id: int):
-    """Check if favorites feature is enabled for this server"""
-    async with aiosqlite.connect(DB_PATH) as db:
+@timed_query
+async def get_user_favorites_page(user_id: int, guild_id: int, before: tuple = None, limit: int = 5):
+    """Get up to limit favorites, newest first, after the (added_at, id) cursor"""
+    async with connection() as db:
+        if before is None:
+            cursor = await db.execute(
+                """SELECT f.id, q.quote_text, q.quote_author, f.added_at
+                   FROM favorites f JOIN quotes q ON q.id = f.quote_id
+                   WHERE f.user_id = ? AND f.guild_id = ?
+                   ORDER BY f.added_at DESC, f.id DESC LIMIT ?""",
+                (user_id, guild_id, limit)
+            )
+        else:
+            cursor = await db.execute(
+                """SELECT f.id, q.quote_text, q.quote_author, f.added_at
+                   FROM favorites f JOIN quotes q ON q.id = f.quote_id
+                   WHERE f.user_id = ? AND f.guild_id = ? AND (f.added_at, f.id) < (?, ?)
+                   ORDER BY f.added_at DESC, f.id DESC LIMIT ?""",
+                (user_id, guild_id, before[0], before[1], limit)
+            )
+        return await cursor.fetchall()
+
+def search_query(user_id: int, guild_id: int, text: str):
+    """FTS5 query for a user's favorites containing every word of text, the last one as a prefix"""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    # Quoted so user input can't use FTS5 syntax
+    terms = " ".join(f'"{word}"' for word in words) + "*"
+    # One token per user and server, the same as favorite_quotes.scope
+    return f'scope : "u{user_id}g{guild_id}" AND {{quote_text quote_author}} : ({terms})'
+
+@timed_query
+async def search_user_favorites(user_id: int, guild_id: int, text: str, limit: int = 5, offset: int = 0, ranked: bool = True):
+    """Get up to limit of a user's favorites matching text, best match first or else newest first"""
+    query = search_query(user_id, guild_id, text)
+    if query is None:
+        return []
+
+    # Newest first follows the index's own rowid order and stops after limit rows
+    order = "favorites_fts.rank, f.id DESC" if ranked else "favorites_fts.rowid DESC"
+    async with connection() as db:
         cursor = await db.execute(
-            "SELECT favorites_enabled FROM server_features WHERE guild_id = ?",
-            (guild_id,)
+            f"""SELECT f.id, q.quote_text, q.quote_author, f.added_at
+                FROM favorites_fts
+                JOIN favorites f ON f.id = favorites_fts.rowid
+                JOIN quotes q ON q.id = f.quote_id
+                WHERE favorites_fts MATCH ?
+                ORDER BY {order} LIMIT ? OFFSET ?""",
+            (query, limit, offset)
         )
-        result = await cursor.fetchone()
-        
-        if result is None:
-            # Create default
-            await db.execute(
-                "INSERT INTO server_features (guild_id, favorites_enabled) VALUES (?, 1)",
-                (guild_id,)
-            )
-            await db.commit()
-            return True
-        
-        return bool(result[0])
+        return await cursor.fetchall()
+
+@timed_query
+async def count_user_favorite_matches(user_id: int, guild_id: int, text: str):
+    """Count a user's favorites in a server matching text"""
+    query = search_query(user_id, guild_id, text)
+    if query is None:
+        return 0
+
+    async with connection() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM favorites_fts WHERE favorites_fts MATCH ?", (query,))
+        return (await cursor.fetchone())[0]
+
+@timed_query
+async def count_user_favorites(user_id: int, guild_id: int):
+    """Count a user's favorites in a server, cached until they change"""
+    key = (user_id, guild_id)
+    count = _favorite_counts.get(key)
+    if isinstance(count, int):
+        return count
 
+    # Stands in for the count while it's queried, an add/remove pops it
+    pending = object()
+    _favorite_counts.set(key, pending)
+
+    async with connection() as db:
+        cursor = await db.execute(
+            "SELECT COUNT(*) FROM favorites WHERE user_id = ? AND guild_id = ?",
+            (user_id, guild_id)
+        )
+        count = (await cursor.fetchone())[0]
+
+    # Only cache if no add/remove invalidated this count meanwhile
+    if _favorite_counts.get(key) is pending:
+        _favorite_counts.set(key, count)
+    return count
+
+@timed_query
+async def load_feature_flags():
+    """Load every server's feature toggles into memory with one query"""
+    global _favorites_enabled
+
+    async with connection() as db:
+        cursor = await db.execute("SELECT guild_id, favorites_enabled FROM server_features")
+        _favorites_enabled = {guild_id: bool(enabled) for guild_id, enabled in await cursor.fetchall()}
+
+def favorites_enabled(guild_id: int):
+    """In-memory favorites toggle, servers without a row use the default (enabled)"""
+    return _favorites_enabled.get(guild_id, True)
+
+@timed_query
+async def is_favorites_enabled(guild_id: int):
+    """Check if favorites feature is enabled for this server"""
+    if _favorites_enabled is None:
+        await load_feature_flags()
+    return favorites_enabled(guild_id)
+
+@timed_query
 async def set_favorites_enabled(guild_id: int, enabled: bool):
     """Enable or disable favorites feature"""
-    async with aiosqlite.connect(DB_PATH) as db:
+    if _favorites_enabled is None:
+        await load_feature_flags()
+
+    async with connection() as db:
         await db.execute(
             "INSERT OR REPLACE INTO server_features (guild_id, favorites_enabled) VALUES (?, ?)",
             (guild_id, enabled)
         )
         await db.commit()
+
+    _favorites_enabled[guild_id] = bool(enabled)
@@ -0,0 +1,242 @@
+import functools
+import math
+import os
+import time
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Each shard cluster process listens on METRICS_PORT + CLUSTER_ID
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108")) + int(os.getenv("CLUSTER_ID", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0)
+
+_registry = []
+_server = None
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count, optionally split by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        for labelvalues, value in sorted(self._values.items()):
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+class Gauge(Counter):
+    """Value that goes up and down, or is read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, *labelvalues):
+        self._values[labelvalues] = value
+
+    def set_function(self, function):
+        self._function = function
+
+    def value(self, *labelvalues):
+        if self._function is not None:
+            return self._function()
+        return super().value(*labelvalues)
+
+    def samples(self):
+        if self._function is not None:
+            yield self.name, "", self._function()
+        else:
+            yield from super().samples()
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, per label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values = {}  # labelvalues -> [bucket counts..., sum, count]
+
+    def observe(self, value, *labelvalues):
+        state = self._values.get(labelvalues)
+        if state is None:
+            state = self._values[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[index] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def count(self, *labelvalues):
+        state = self._values.get(labelvalues)
+        return state[-1] if state else 0
+
+    def quantile(self, q, *labelvalues):
+        """Estimate a quantile by interpolating inside its bucket, None without samples"""
+        state = self._values.get(labelvalues)
+        if not state or not state[-1]:
+            return None
+
+        rank = q * state[-1]
+        seen = 0
+        lower = 0.0
+        for index, bound in enumerate(self.buckets):
+            in_bucket = state[index]
+            if in_bucket and seen + in_bucket >= rank:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / in_bucket
+            seen += in_bucket
+            lower = bound if bound != math.inf else lower
+        return lower
+
+    def samples(self):
+        for labelvalues, state in sorted(self._values.items()):
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                labels = _format_labels(self.labelnames, labelvalues, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum", labels, state[-2]
+            yield f"{self.name}_count", labels, state[-1]
+
+class _NoopMetric:
+    """Stand-in for every metric while metrics are disabled"""
+
+    def inc(self, *labelvalues, amount=1):
+        pass
+
+    def set(self, value, *labelvalues):
+        pass
+
+    def set_function(self, function):
+        pass
+
+    def observe(self, value, *labelvalues):
+        pass
+
+NOOP = _NoopMetric()
+
+def _register(metric):
+    if not METRICS_ENABLED:
+        return NOOP
+    _registry.append(metric)
+    return metric
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+def timed(histogram, label=None):
+    """Decorate a coroutine function to observe its duration, labelled with its name by default"""
+    def decorator(function):
+        if histogram is NOOP:
+            return function
+
+        labelvalues = (label or function.__name__,) if histogram.labelnames else ()
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, *labelvalues)
+        return wrapper
+    return decorator
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+def summary():
+    """Short human-readable lines for the admin command"""
+    lines = []
+    for metric in _registry:
+        if isinstance(metric, Histogram):
+            for labelvalues in sorted(metric._values):
+                count = metric.count(*labelvalues)
+                p50 = metric.quantile(0.5, *labelvalues)
+                p99 = metric.quantile(0.99, *labelvalues)
+                label = f"[{','.join(map(str, labelvalues))}]" if labelvalues else ""
+                lines.append(f"{metric.name}{label}: n={count} p50={p50:.4f} p99={p99:.4f}")
+        else:
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels}: {_format_value(value)}")
+    return lines
+
+async def start_metrics_server():
+    """Serve /metrics on METRICS_HOST:METRICS_PORT when metrics are enabled"""
+    global _server
+
+    if not METRICS_ENABLED or _server is not None:
+        return
+
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    except OSError as e:
+        print(f"❌ Error starting metrics server: {e}")
+        await runner.cleanup()
+        return
+
+    _server = runner
+    print(f"📈 Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+async def stop_metrics_server():
+    global _server
+
+    if _server is not None:
+        await _server.cleanup()
+        _server = None
@@ -0,0 +1,108 @@
+import bisect
+import random
+from collections import deque
+from utils.database import add_corpus_quotes, get_corpus_quotes, get_quote_cursors, save_quote_cursors
+from utils.circuit_breaker import CircuitOpenError
+from utils.quote_fetcher import get_session, zenquotes_breaker
+
+ZEN_QUOTES_BATCH_URL = "https://zenquotes.io/api/quotes"
+CORPUS_TARGET_SIZE = 5000
+BUFFER_SIZE = 50
+
+_quote_ids = []  # sorted corpus ids
+_quotes = {}  # id -> (quote_text, author)
+_cursors = {}  # guild_id -> last corpus id sent
+_dirty_cursors = {}  # cursors changed since the last flush
+_buffer = deque(maxlen=BUFFER_SIZE)
+
+def corpus_size():
+    return len(_quote_ids)
+
+async def load_corpus():
+    """Load the local corpus and per-server cursors into memory"""
+    global _cursors
+
+    await _load_new_quotes()
+    _cursors = await get_quote_cursors()
+    fill_buffer()
+    print(f"📚 Loaded {len(_quote_ids)} corpus quotes")
+
+async def _load_new_quotes():
+    after_id = _quote_ids[-1] if _quote_ids else 0
+    for quote_id, quote_text, author in await get_corpus_quotes(after_id):
+        _quote_ids.append(quote_id)
+        _quotes[quote_id] = (quote_text, author)
+
+async def _request_batch():
+    session = await get_session()
+    async with session.get(ZEN_QUOTES_BATCH_URL) as response:
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        return await response.json(content_type=None)
+
+async def refill_corpus():
+    """Fetch one batch of quotes from ZenQuotes into the local corpus"""
+    try:
+        batch = await zenquotes_breaker.call(_request_batch)
+    except CircuitOpenError:
+        return 0
+    except Exception as e:
+        print(f"❌ Error refilling corpus: {e!r}")
+        return 0
+
+    quotes = [(item["q"], item["a"]) for item in batch if item.get("q") and item.get("a")]
+    before = len(_quote_ids)
+
+    await add_corpus_quotes(quotes)
+    await _load_new_quotes()
+    fill_buffer()
+
+    return len(_quote_ids) - before
+
+def fill_buffer():
+    """Top up the ring buffer of ready-to-send quotes from the corpus"""
+    missing = BUFFER_SIZE - len(_buffer)
+    if missing <= 0 or not _quote_ids:
+        return
+
+    for quote_id in random.sample(_quote_ids, min(missing, len(_quote_ids))):
+        _buffer.append(_quotes[quote_id])
+
+def pop_quote():
+    """Pop a ready (quote_text, author) from memory, or None if the corpus is empty"""
+    if not _buffer:
+        fill_buffer()
+    return _buffer.popleft() if _buffer else None
+
+def next_quote_for_guild(guild_id):
+    """Next corpus quote this server hasn't had yet, wrapping around at the end"""
+    if not _quote_ids:
+        return None
+
+    last_id = _cursors.get(guild_id)
+    if last_id is None:
+        # Start new servers at a random point so they don't all share a sequence
+        index = random.randrange(len(_quote_ids))
+    else:
+        index = bisect.bisect_right(_quote_ids, last_id) % len(_quote_ids)
+
+    quote_id = _quote_ids[index]
+    _cursors[guild_id] = quote_id
+    _dirty_cursors[guild_id] = quote_id
+
+    return _quotes[quote_id]
+
+async def flush_cursors():
+    """Persist every cursor that moved since the last flush in one transaction"""
+    if not _dirty_cursors:
+        return
+
+    batch = dict(_dirty_cursors)
+    _dirty_cursors.clear()
+    try:
+        await save_quote_cursors(batch)
+    except:
+        # Keep them for the next flush unless they moved again meanwhile
+        for guild_id, quote_id in batch.items():
+            _dirty_cursors.setdefault(guild_id, quote_id)
+        raise
@@ -1,7 +1,12 @@
-import requests
-import random
+import aiohttp
+import asyncio
+from datetime import datetime, timezone
+from utils.circuit_breaker import CircuitBreaker
 
 ZEN_QUOTES_API_URL = "https://zenquotes.io/api/today"
+REQUEST_TIMEOUT_SECONDS = 10
+# How long ZenQuotes is left alone once the breaker trips
+FAILURE_RETRY_SECONDS = 60
 FALLBACK_QUOTES = [
     {
         "quote": "In its prime, it dispensed wisdom. Now, it dispenses silence. Even the bot must rest.",
@@ -25,29 +30,89 @@ FALLBACK_QUOTES = [
     }
 ]
 
-def fetch_quote():
-    """Fetch daily quote from ZenQuotes API"""
+_session = None
+_daily_quote = None  # (upstream day, (quote_text, author))
+_inflight = None
+
+# Shared by every ZenQuotes endpoint, an outage takes them all down
+zenquotes_breaker = CircuitBreaker(
+    "zenquotes",
+    open_seconds=FAILURE_RETRY_SECONDS,
+    max_timeout=REQUEST_TIMEOUT_SECONDS
+)
+
+async def get_session():
+    """Shared HTTP session, created on first use"""
+    global _session
+
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS),
+            connector=aiohttp.TCPConnector(limit=10, ttl_dns_cache=300)
+        )
+    return _session
+
+async def close_session():
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+def upstream_day():
+    """ZenQuotes rolls its quote of the day over at midnight UTC"""
+    return datetime.now(timezone.utc).date()
+
+async def request_daily_quote():
+    session = await get_session()
+    async with session.get(ZEN_QUOTES_API_URL) as response:
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+
+        quote_data = (await response.json(content_type=None))[0]
+        return quote_data.get('q', 'No quote available'), quote_data.get('a', 'Unknown')
+
+async def _refresh_daily_quote(day):
+    global _daily_quote, _inflight
+
+    # Imported here, the providers themselves build on this module
+    from utils.quote_providers import daily_fetcher
+
     try:
-        response = requests.get(ZEN_QUOTES_API_URL, timeout=10)
-        
-        if response.status_code == 200:
-            quote_data = response.json()[0]
-            quote_text = quote_data.get('q', 'No quote available')
-            author = quote_data.get('a', 'Unknown')
-            
-            return f"📖 **Daily Quote**\n\n_{quote_text}_\n\n— **{author}**"
-        else:
-            return get_fallback_quote()
-            
-    except Exception as e:
-        print(f"❌ Error fetching quote: {e}")
-        return get_fallback_quote()
-
-def get_fallback_quote():
-    """Return a random funny fallback quote when API fails"""
-    quote_data = random.choice(FALLBACK_QUOTES)
-    return (
-        f"📖 **Bonus Quote**\n\n"
-        f"_{quote_data['quote']}_\n\n"
-        f"— **{quote_data['author']}**"
-    )
+        quote, provider = await daily_fetcher.fetch()
+    finally:
+        _inflight = None
+
+    # Only the real quote of the day is kept for the rest of the day
+    if quote is not None and provider.authoritative:
+        _daily_quote = (day, quote)
+    return quote
+
+def cache_daily_quote(quote):
+    """Keep a quote of the day that arrived after a fallback was already used"""
+    global _daily_quote
+    _daily_quote = (upstream_day(), quote)
+
+def peek_daily_quote():
+    """Today's (quote_text, author) if it is already cached, without any I/O"""
+    if _daily_quote is not None and _daily_quote[0] == upstream_day():
+        return _daily_quote[1]
+    return None
+
+async def get_daily_quote():
+    """Get today's (quote_text, author), from the first quote provider to answer"""
+    global _inflight
+
+    day = upstream_day()
+    if _daily_quote is not None and _daily_quote[0] == day:
+        return _daily_quote[1]
+
+    # Concurrent callers all wait on the same request
+    if _inflight is None:
+        _inflight = asyncio.ensure_future(_refresh_daily_quote(day))
+
+    return await asyncio.shield(_inflight)
+
+def format_quote(quote_text, author, title="Daily Quote"):
+    """Format a quote the way it is posted in Discord"""
+    return f"📖 **{title}**\n\n_{quote_text}_\n\n— **{author}**"
@@ -0,0 +1,200 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from utils import metrics
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.quote_corpus import pop_quote
+from utils.quote_fetcher import REQUEST_TIMEOUT_SECONDS, cache_daily_quote, get_session, request_daily_quote, zenquotes_breaker
+
+# Comma separated provider names, ties are tried in this order, "json" needs QUOTE_JSON_URL
+QUOTE_PROVIDERS = os.getenv("QUOTE_PROVIDERS", "zenquotes,corpus")
+# Hedge delay for a provider with too few latency samples to have a p95
+DEFAULT_HEDGE_SECONDS = 1.0
+LATENCY_SAMPLES = 200
+
+PROVIDER_SECONDS = metrics.histogram("quotes_provider_seconds", "Latency of successful quote provider calls", ("provider",))
+PROVIDER_FAILURES = metrics.counter("quotes_provider_failures_total", "Quote provider calls that failed or returned nothing", ("provider",))
+PROVIDER_WINS = metrics.counter("quotes_provider_wins_total", "Fetches answered by each quote provider", ("provider",))
+HEDGES = metrics.counter("quotes_provider_hedges_total", "Extra providers started because the previous ones were slow or failed")
+
+class QuoteProvider:
+    """A source of (quote_text, author)"""
+
+    name = "provider"
+    # Whether its answer is the quote of the day, which may be cached until the next day
+    authoritative = False
+
+    async def fetch(self):
+        """(quote_text, author), or None when there is nothing to give"""
+        raise NotImplementedError
+
+class ZenQuotesProvider(QuoteProvider):
+    name = "zenquotes"
+    authoritative = True
+
+    async def fetch(self):
+        return await zenquotes_breaker.call(request_daily_quote)
+
+class CorpusProvider(QuoteProvider):
+    """Random quote from the local SQLite corpus, already in memory"""
+
+    name = "corpus"
+
+    async def fetch(self):
+        return pop_quote()
+
+class JsonHttpProvider(QuoteProvider):
+    """Any HTTP endpoint returning JSON, with dotted paths to the quote and author"""
+
+    def __init__(self, name, url, quote_path="q", author_path="a", authoritative=False):
+        self.name = name
+        self.url = url
+        self.quote_path = quote_path
+        self.author_path = author_path
+        self.authoritative = authoritative
+        self.breaker = CircuitBreaker(name, max_timeout=REQUEST_TIMEOUT_SECONDS)
+
+    async def fetch(self):
+        return await self.breaker.call(self._request)
+
+    async def _request(self):
+        session = await get_session()
+        async with session.get(self.url) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            data = await response.json(content_type=None)
+
+        quote_text = _lookup(data, self.quote_path)
+        author = _lookup(data, self.author_path)
+        if not quote_text:
+            return None
+        return str(quote_text), str(author or "Unknown")
+
+def _lookup(data, path):
+    # Lists are indexed by number, a list at the top is looked into at [0]
+    if isinstance(data, list) and data and not path.split(".")[0].isdigit():
+        data = data[0]
+    for key in path.split("."):
+        try:
+            data = data[int(key)] if isinstance(data, list) else data[key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+    return data
+
+class HedgedFetcher:
+    """Ask providers in turn, starting the next one when the previous is slower than its p95"""
+
+    def __init__(self, providers, on_late_answer=None):
+        self.providers = list(providers)
+        self._latencies = {provider.name: deque(maxlen=LATENCY_SAMPLES) for provider in self.providers}
+        # Called with (quote, provider) when an authoritative provider answers after a fallback won
+        self.on_late_answer = on_late_answer
+        self._late = {}  # provider name -> request left running after a fetch returned
+
+    def p95(self, provider):
+        samples = sorted(self._latencies[provider.name])
+        if len(samples) < 5:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(0.95 * len(samples)) - 1)]
+
+    def hedge_delay(self, provider):
+        p95 = self.p95(provider)
+        return DEFAULT_HEDGE_SECONDS if p95 is None else p95
+
+    def ordered(self):
+        """Authoritative providers first, each group fastest p95 first"""
+        return sorted(
+            self.providers,
+            key=lambda provider: (not provider.authoritative, self.p95(provider) or DEFAULT_HEDGE_SECONDS)
+        )
+
+    async def _call(self, provider):
+        started = time.perf_counter()
+        try:
+            quote = await provider.fetch()
+        except CircuitOpenError:
+            quote = None
+        except Exception as e:
+            print(f"❌ Error fetching quote from {provider.name}: {e!r}")
+            quote = None
+
+        if not quote:
+            PROVIDER_FAILURES.inc(provider.name)
+            return None
+
+        latency = time.perf_counter() - started
+        self._latencies[provider.name].append(latency)
+        PROVIDER_SECONDS.observe(latency, provider.name)
+        return quote
+
+    async def fetch(self):
+        """First valid ((quote_text, author), provider), or (None, None) if every provider failed"""
+        queue = self.ordered()
+        pending = {}
+        try:
+            while queue or pending:
+                timeout = None
+                if queue:
+                    provider = queue.pop(0)
+                    if pending:
+                        HEDGES.inc()
+                    # A request still running from an earlier fetch is joined, not repeated
+                    task = self._late.get(provider.name) or asyncio.ensure_future(self._call(provider))
+                    pending[task] = provider
+                    # With providers left, wait only until this one is late
+                    timeout = self.hedge_delay(provider) if queue else None
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = pending.pop(task)
+                    quote = task.result()
+                    if quote:
+                        PROVIDER_WINS.inc(provider.name)
+                        return quote, provider
+                # Late or failed, either way the next provider starts now
+            return None, None
+        finally:
+            for task, provider in pending.items():
+                # Let slow authoritative providers finish, so they are cached and
+                # get latency samples instead of being cut off at every hedge
+                if provider.authoritative and not task.done():
+                    self._finish_late(task, provider)
+                else:
+                    task.cancel()
+
+    def _finish_late(self, task, provider):
+        if self._late.get(provider.name) is task:
+            return
+        self._late[provider.name] = task
+
+        def done(task):
+            self._late.pop(provider.name, None)
+            if task.cancelled() or not task.result():
+                return
+            if self.on_late_answer is not None:
+                self.on_late_answer(task.result(), provider)
+
+        task.add_done_callback(done)
+
+def build_providers(names=QUOTE_PROVIDERS):
+    """Providers named in QUOTE_PROVIDERS, unknown names are skipped"""
+    providers = []
+    for name in (name.strip() for name in names.split(",")):
+        if name == "zenquotes":
+            providers.append(ZenQuotesProvider())
+        elif name == "corpus":
+            providers.append(CorpusProvider())
+        elif name == "json" and os.getenv("QUOTE_JSON_URL"):
+            providers.append(JsonHttpProvider(
+                "json",
+                os.getenv("QUOTE_JSON_URL"),
+                os.getenv("QUOTE_JSON_QUOTE_PATH", "q"),
+                os.getenv("QUOTE_JSON_AUTHOR_PATH", "a")
+            ))
+        elif name:
+            print(f"❌ Unknown quote provider: {name}")
+    return providers
+
+daily_fetcher = HedgedFetcher(build_providers(), on_late_answer=lambda quote, provider: cache_daily_quote(quote))
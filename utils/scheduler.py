@@ -0,0 +1,153 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta, timezone, time as dt_time
+from functools import lru_cache
+
+DEFAULT_TIMEZONE = "Europe/Brussels"
+
+# pytz is imported on first use so loading the cogs stays cheap
+
+@lru_cache(maxsize=1)
+def _valid_timezones():
+    import pytz
+    return frozenset(pytz.all_timezones)
+
+def is_valid_timezone(name):
+    return name in _valid_timezones()
+
+@lru_cache(maxsize=None)
+def get_timezone(name):
+    """Resolve a timezone name once, falling back to the default"""
+    import pytz
+    try:
+        return pytz.timezone(name)
+    except:
+        return pytz.timezone(DEFAULT_TIMEZONE)
+
+def parse_quote_time(quote_time):
+    """Minutes after local midnight for an HH:MM string"""
+    try:
+        hour, minute = map(int, quote_time.split(":"))
+        return hour * 60 + minute
+    except:
+        return 8 * 60
+
+class GuildSchedule:
+    """A guild's delivery settings resolved once, plus its next due epoch"""
+
+    __slots__ = ("guild_id", "channel_id", "role_id", "tz", "minutes", "interval", "next_due")
+
+    def __init__(self, guild_id, config, last_sent=None):
+        self.guild_id = guild_id
+        self.channel_id = config.get("channel_id")
+        self.role_id = config.get("role_id")
+        self.tz = get_timezone(config.get("timezone", DEFAULT_TIMEZONE))
+        self.minutes = parse_quote_time(config.get("quote_time", "08:00"))
+        self.interval = config.get("interval", 24)
+        self.next_due = self.compute_next_due(last_sent)
+
+    def _slot_on(self, day):
+        local = datetime.combine(day, dt_time(self.minutes // 60, self.minutes % 60))
+        return self.tz.localize(local).astimezone(timezone.utc)
+
+    def compute_next_due(self, last_sent, now=None):
+        """Next UTC epoch second this guild is due for a quote"""
+        # Never sent before: today's slot, or right away if it already passed
+        if last_sent is None:
+            now = now or datetime.now(timezone.utc)
+            return int(self._slot_on(now.astimezone(self.tz).date()).timestamp())
+
+        if last_sent.tzinfo is None:
+            last_sent = last_sent.replace(tzinfo=timezone.utc)
+
+        earliest = last_sent + timedelta(hours=self.interval)
+        day = last_sent.astimezone(self.tz).date()
+
+        # First local day whose slot comes after last_sent and that still has
+        # time left once the interval has elapsed
+        for _ in range(self.interval // 24 + 3):
+            slot = self._slot_on(day)
+            if slot > last_sent:
+                due = max(slot, earliest)
+                if due.astimezone(self.tz).date() == day:
+                    return int(due.timestamp())
+            day += timedelta(days=1)
+
+        return int(earliest.timestamp())
+
+    def skip_to(self, now):
+        """Move next_due to the first slot after now, dropping missed ones"""
+        day = now.astimezone(self.tz).date()
+        while self._slot_on(day) <= now:
+            day += timedelta(days=1)
+        self.next_due = int(self._slot_on(day).timestamp())
+        return self.next_due
+
+class QuoteScheduler:
+    """Min-heap of guild ids keyed on their next due UTC epoch"""
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._due)
+
+    def schedule(self, guild_id, due):
+        """Set (or move) the next due instant of a guild"""
+        due_ts = due.timestamp() if isinstance(due, datetime) else float(due)
+        self._due[guild_id] = due_ts
+        heapq.heappush(self._heap, (due_ts, guild_id))
+
+        # Wake the sleeper if this guild is now the first one due
+        if self._heap[0] == (due_ts, guild_id):
+            self._wakeup.set()
+
+    def remove(self, guild_id):
+        """Stop scheduling a guild, its heap entry is dropped lazily"""
+        self._due.pop(guild_id, None)
+
+    def clear(self):
+        self._heap.clear()
+        self._due.clear()
+        self._wakeup.set()
+
+    def next_due(self):
+        """Epoch of the first live entry, or None when nothing is scheduled"""
+        while self._heap:
+            due_ts, guild_id = self._heap[0]
+            if self._due.get(guild_id) == due_ts:
+                return due_ts
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now_ts=None):
+        """Pop every guild whose due instant has passed"""
+        now_ts = time.time() if now_ts is None else now_ts
+        due_guilds = []
+
+        while True:
+            due_ts = self.next_due()
+            if due_ts is None or due_ts > now_ts:
+                break
+            _, guild_id = heapq.heappop(self._heap)
+            del self._due[guild_id]
+            due_guilds.append(guild_id)
+
+        return due_guilds
+
+    async def wait(self):
+        """Sleep until the first guild is due or the schedule changes"""
+        self._wakeup.clear()
+        due_ts = self.next_due()
+        timeout = None if due_ts is None else max(0.0, due_ts - time.time())
+
+        if timeout == 0.0:
+            return
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,32 @@
+import os
+
+def shard_for_guild(guild_id, shard_count):
+    """Shard a guild lives on, the same formula Discord uses"""
+    return (guild_id >> 22) % shard_count
+
+def get_shard_config():
+    """(shard_count, shard_ids) from SHARD_COUNT / SHARD_IDS, or (None, None) to let Discord decide"""
+    shard_count = os.getenv("SHARD_COUNT")
+    shard_ids = os.getenv("SHARD_IDS")
+
+    if not shard_count:
+        return None, None
+
+    shard_count = int(shard_count)
+    if not shard_ids:
+        return shard_count, list(range(shard_count))
+
+    return shard_count, [int(shard_id) for shard_id in shard_ids.split(",") if shard_id.strip()]
+
+def split_shards(shard_count, clusters):
+    """Split shard ids into contiguous, evenly sized groups, one per cluster process"""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+
+    groups = []
+    start = 0
+    for index in range(clusters):
+        end = start + size + (1 if index < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups